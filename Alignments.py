@@ -0,0 +1,323 @@
+import heapq
+import math
+import time
+from collections import Counter
+
+from EventLog import as_event_log
+import Instrumentation
+
+SKIP = '>>'  # The missing side of a log move or a model move
+EPSILON = 1e-9
+
+
+def simplex(A, b, c):
+    """Solves min c.x subject to A x = b, x >= 0 with a two-phase tableau simplex.
+
+    A is a list of rows, b and c lists. Bland's rule keeps degenerate
+    problems from cycling. Returns (value, x), or None if there is no
+    solution.
+    """
+    m = len(A)
+    n = len(c)
+    # Phase 1 tableau with an artificial variable per row and b >= 0
+    rows = []
+    for i in range(m):
+        sign = -1.0 if b[i] < 0 else 1.0
+        row = [sign * a for a in A[i]]
+        row.extend(1.0 if j == i else 0.0 for j in range(m))
+        row.append(sign * b[i])
+        rows.append(row)
+    basis = list(range(n, n + m))
+
+    def pivot(r, col):
+        pivot_row = rows[r]
+        value = pivot_row[col]
+        rows[r] = pivot_row = [a / value for a in pivot_row]
+        for i, row in enumerate(rows):
+            if i != r:
+                factor = row[col]
+                if factor:
+                    rows[i] = [a - factor * p for a, p in zip(row, pivot_row)]
+        basis[r] = col
+
+    def optimize(cost, columns):
+        while True:
+            # Reduced costs of the allowed non-basic columns, first negative one enters
+            entering = None
+            basic = set(basis)
+            for col in columns:
+                if col not in basic:
+                    reduced = cost[col] - sum(cost[basis[i]] * rows[i][col] for i in range(len(rows)))
+                    if reduced < -EPSILON:
+                        entering = col
+                        break
+            if entering is None:
+                return True
+            leaving = None
+            best = None
+            for i, row in enumerate(rows):
+                if row[entering] > EPSILON:
+                    ratio = row[-1] / row[entering]
+                    if best is None or ratio < best - EPSILON or (ratio <= best + EPSILON
+                                                                  and basis[i] < basis[leaving]):
+                        best = ratio
+                        leaving = i
+            if leaving is None:
+                return False  # Unbounded
+            pivot(leaving, entering)
+
+    phase1 = [0.0] * n + [1.0] * m
+    optimize(phase1, range(n + m))
+    if sum(row[-1] for row, var in zip(rows, basis) if var >= n) > EPSILON:
+        return None
+    # Drive artificial variables left in the basis at zero out, or drop their redundant rows
+    for i in reversed(range(len(rows))):
+        if basis[i] >= n:
+            col = next((j for j in range(n) if abs(rows[i][j]) > EPSILON), None)
+            if col is None:
+                del rows[i]
+                del basis[i]
+            else:
+                pivot(i, col)
+    if not optimize(list(c) + [0.0] * m, range(n)):
+        return None
+    x = [0.0] * n
+    for row, var in zip(rows, basis):
+        x[var] = row[-1]
+    return sum(cost * value for cost, value in zip(c, x)), x
+
+
+class Aligner:
+    """A* search for optimal alignments of traces on a CompiledNet.
+
+    Log moves and model moves cost 1 and synchronous moves 0. The search
+    runs over pairs of a marking and a trace position, and its heuristic is
+    the marking equation of the synchronous product, relaxed to an LP over
+    the Parikh vector of the rest of the trace: model moves and synchronous
+    moves per transition plus log moves per activity, subject to reaching
+    the final marking and explaining every remaining event. A child whose
+    move is in the parent's LP solution reuses that solution minus the move,
+    which is still optimal, so most states never solve an LP.
+    """
+
+    def __init__(self, net, labels, final_marking):
+        self.net = net
+        self.labels = labels  # Transition index to activity name
+        self.final_marking = net.pack([final_marking.get(place, 0) for place in net.places])
+        self.final_counts = net.unpack(self.final_marking)
+        self.label_transitions = {}
+        for transition, label in enumerate(labels):
+            self.label_transitions.setdefault(label, []).append(transition)
+        # Incidence matrix by place and transition
+        self.incidence = [[0] * len(labels) for _ in net.places]
+        for transition in range(len(labels)):
+            for place in net.preset[transition]:
+                self.incidence[place][transition] -= 1
+            for place in net.postset[transition]:
+                self.incidence[place][transition] += 1
+
+    def equation(self, activities):
+        """Builds the constraint matrix and costs of the heuristic LP for a trace's activities.
+
+        Variables are model moves per transition, synchronous moves per
+        transition with a label in activities, then log moves per activity.
+        Returns (A, c, sync_variable, log_variable).
+        """
+        n_transitions = len(self.labels)
+        sync_variable = {}
+        for activity in activities:
+            for transition in self.label_transitions.get(activity, ()):
+                sync_variable[transition] = n_transitions + len(sync_variable)
+        log_variable = {activity: n_transitions + len(sync_variable) + i for i, activity in enumerate(activities)}
+        n = n_transitions + len(sync_variable) + len(activities)
+        A = []
+        for row in self.incidence:
+            constraint = list(row) + [0] * (n - n_transitions)
+            for transition, variable in sync_variable.items():
+                constraint[variable] = row[transition]
+            A.append(constraint)
+        for activity in activities:
+            constraint = [0] * n
+            for transition in self.label_transitions.get(activity, ()):
+                constraint[sync_variable[transition]] = 1
+            constraint[log_variable[activity]] = 1
+            A.append(constraint)
+        c = [1.0] * n_transitions + [0.0] * len(sync_variable) + [1.0] * len(activities)
+        return A, c, sync_variable, log_variable
+
+    def heuristic(self, system, activities, marking, remaining):
+        """Solves the heuristic LP of a state; returns (h, solution) or None if the final marking is out of reach."""
+        A, c = system
+        counts = self.net.unpack(marking)
+        b = [final - count for final, count in zip(self.final_counts, counts)]
+        b.extend(remaining[activity] for activity in activities)
+        result = simplex(A, b, c)
+        if result is None:
+            return None
+        value, x = result
+        # Costs are integers, so the LP bound can be rounded up
+        return math.ceil(value - EPSILON), x
+
+    def align(self, trace, time_budget=None):
+        """Optimal alignment of a trace of activity names.
+
+        Returns (cost, moves) with moves a list of (log, model) pairs, SKIP
+        on the missing side, or None if time_budget seconds pass first or
+        the final marking cannot be reached.
+        """
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        net = self.net
+        activities = sorted(set(trace))
+        A, c, sync_variable, log_variable = self.equation(activities)
+        system = (A, c)
+        remaining = [None] * (len(trace) + 1)
+        counts = Counter(trace)
+        for position in range(len(trace) + 1):
+            remaining[position] = dict(counts)
+            if position < len(trace):
+                counts[trace[position]] -= 1
+
+        # States are keyed and compared on markings, so they must be in the
+        # single form pack gives; fire keeps them that way
+        start = net.pack(net.unpack(net.initial_marking))
+        first = self.heuristic(system, activities, start, remaining[0])
+        if first is None:
+            return None
+        h, solution = first
+        solved = 1
+        expanded = 0
+        tie = 0
+        # (f, -position, tie, g, h, marking, position, solution), solution None when h is only an estimate
+        queue = [(h, 0, tie, 0, h, start, 0, solution)]
+        best_g = {(start, 0): 0}
+        parents = {(start, 0): None}
+        closed = set()
+        result = None
+        while queue:
+            if deadline is not None and time.perf_counter() > deadline:
+                Instrumentation.count('alignments.timed_out')
+                break
+            f, _, _, g, h, marking, position, solution = heapq.heappop(queue)
+            state = (marking, position)
+            if state in closed or g > best_g[state]:
+                continue
+            if solution is None:
+                # The estimate came from a parent without this move in its solution: solve now
+                exact = self.heuristic(system, activities, marking, remaining[position])
+                solved += 1
+                if exact is None:
+                    closed.add(state)
+                    continue
+                if exact[0] > h:
+                    tie += 1
+                    heapq.heappush(queue, (g + exact[0], -position, tie, g, exact[0], marking, position, exact[1]))
+                    continue
+                h, solution = exact
+            closed.add(state)
+            if position == len(trace) and marking == self.final_marking:
+                result = (g, self.moves(parents, state))
+                break
+            expanded += 1
+
+            # Log move, synchronous moves, then model moves
+            successors = []
+            if position < len(trace):
+                activity = trace[position]
+                successors.append((marking, position + 1, 1, log_variable[activity], (activity, SKIP), None))
+                for transition in self.label_transitions.get(activity, ()):
+                    if net.is_enabled(marking, transition):
+                        successors.append((net.fire(marking, transition)[0], position + 1, 0,
+                                           sync_variable[transition], (activity, activity), transition))
+            for transition in range(len(self.labels)):
+                if net.is_enabled(marking, transition):
+                    successors.append((net.fire(marking, transition)[0], position, 1, transition,
+                                       (SKIP, self.labels[transition]), transition))
+            for child, child_position, cost, variable, move, _ in successors:
+                child_state = (child, child_position)
+                child_g = g + cost
+                if child_state in closed or child_g >= best_g.get(child_state, child_g + 1):
+                    continue
+                best_g[child_state] = child_g
+                parents[child_state] = (state, move)
+                if solution[variable] >= 1 - EPSILON:
+                    child_solution = list(solution)
+                    child_solution[variable] -= 1
+                    child_h = h - cost
+                else:
+                    child_solution = None
+                    child_h = max(0, h - cost)
+                tie += 1
+                heapq.heappush(queue, (child_g + child_h, -child_position, tie, child_g, child_h, child,
+                                       child_position, child_solution))
+        Instrumentation.count('alignments.states_expanded', expanded)
+        Instrumentation.count('alignments.lps_solved', solved)
+        return result
+
+    def moves(self, parents, state):
+        moves = []
+        while parents[state] is not None:
+            state, move = parents[state]
+            moves.append(move)
+        moves.reverse()
+        return moves
+
+
+def build_aligner(pn, final_place='o_W', final_marking=None):
+    """Aligner for a PetriNet; the final marking defaults to one token in final_place."""
+    net = pn.compile()
+    return Aligner(net, net.labels, final_marking or {final_place: 1})
+
+
+def align_log(log, pn, time_budget=None, cache=None, final_place='o_W'):
+    """Aligns every variant of a log once.
+
+    Returns a dict from variant (a tuple of activity names) to its
+    (cost, moves) alignment, or None where the time budget per trace ran
+    out. cache, a dict, carries alignments over to later calls with the
+    same net. It keeps the budget each entry was searched with, so a
+    variant that ran out of time is searched again with a larger budget.
+    """
+    log = as_event_log(log)
+    aligner = build_aligner(pn, final_place)
+    cache = {} if cache is None else cache
+    names = log.activities
+    alignments = {}
+    for trace in log.variants():
+        variant = tuple(names[code] for code in trace)
+        alignment, budget = cache.get(variant, (None, None))
+        # None under a budget may only mean the time ran out; None without one is final
+        if variant not in cache or (alignment is None and budget is not None
+                                    and (time_budget is None or time_budget > budget)):
+            with Instrumentation.stage('alignments'):
+                alignment = aligner.align(variant, time_budget)
+            cache[variant] = (alignment, time_budget)
+        alignments[variant] = alignment
+    return alignments
+
+
+def alignment_fitness(log, pn, time_budget=None, cache=None, final_place='o_W'):
+    """Alignment-based fitness of a log: 1 - total cost / total worst cost over all cases.
+
+    The worst cost of a case is its length plus the cost of the shortest
+    run through the model, the cost of aligning it with log and model moves
+    only. Cases whose variant could not be aligned in time_budget seconds
+    are left out, and the shortest model run is searched under the same
+    budget. Returns None if no case could be scored.
+    """
+    log = as_event_log(log)
+    alignments = align_log(log, pn, time_budget, cache, final_place)
+    names = log.activities
+    scored = [(alignments[tuple(names[code] for code in trace)], len(trace), len(cases))
+              for trace, cases in log.variants().items()]
+    scored = [(alignment[0], length, cases) for alignment, length, cases in scored if alignment is not None]
+    if not scored:
+        return None
+    empty = build_aligner(pn, final_place).align((), time_budget)
+    if empty is None:
+        return None
+    model_cost = empty[0]
+    total_cost = sum(cost * cases for cost, _, cases in scored)
+    worst_cost = sum((length + model_cost) * cases for _, length, cases in scored)
+    if worst_cost == 0:
+        return 1.0
+    return 1 - total_cost / worst_cost
@@ -1,304 +1,160 @@
-from collections import defaultdict
-from datetime import datetime
-import xml.etree.ElementTree as ET
-from itertools import combinations
+from EventLog import as_event_log
+import Instrumentation
+from Footprint import Footprint
+from LogCache import load_log
+from ModelCache import load_model
+from PetriNet import PetriNet
+from TokenReplay import replay_totals
+
+
+def bits(mask):
+    """Yields the positions of the set bits of mask."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def maximal_cliques(candidates, neighbours):
+    """Yields every maximal clique of the graph induced by the candidates bitmask.
+
+    neighbours maps a node to the bitmask of its neighbours, without itself.
+    This is Bron-Kerbosch with pivoting, run on bitmasks.
+    """
+    stack = [(0, candidates, 0)]
+    while stack:
+        clique, pool, excluded = stack.pop()
+        if not pool:
+            if not excluded:
+                yield clique
+            continue
+        # Nodes adjacent to the pivot are covered by the branches of the others
+        pivot = (pool | excluded).bit_length() - 1
+        for v in bits(pool & ~neighbours[pivot]):
+            bit = 1 << v
+            stack.append((clique | bit, pool & neighbours[v], excluded & neighbours[v]))
+            pool &= ~bit
+            excluded |= bit
+
+
+def maximal_place_pairs(causal, reverse_causal, unrelated):
+    """Yields the maximal (A, B) pairs of the alpha algorithm as bitmasks.
+
+    A pair is valid when a > b for every a in A and b in B and both sets are
+    pairwise '#'. A is grown only from activities with a causal successor and
+    only while the common successors are not empty, so invalid sets are pruned
+    as soon as they appear. For each A the maximal sets B are the maximal '#'
+    cliques among those successors, and (A, B) is kept if no other activity
+    could still join A. The relations are bitmasks indexed by activity code,
+    as kept by Footprint.
+    """
+    # Each A is built in increasing code order, so it is visited only once
+    stack = [(1 << a, causal[a], unrelated[a] & ~((2 << a) - 1))
+             for a in range(len(causal)) if causal[a]]
+    tested = 0
+    kept = 0
+    while stack:
+        A, successors, extensions = stack.pop()
+        # Activities that are '#' with all of A
+        unrelated_to_A = -1
+        for a in bits(A):
+            unrelated_to_A &= unrelated[a]
+        for B in maximal_cliques(successors, unrelated):
+            tested += 1
+            predecessors = -1
+            for b in bits(B):
+                predecessors &= reverse_causal[b]
+            if not predecessors & unrelated_to_A & ~A:
+                kept += 1
+                yield A, B
+        for a in bits(extensions):
+            common = successors & causal[a]
+            if common:
+                stack.append((A | 1 << a, common, extensions & unrelated[a] & ~((2 << a) - 1)))
+    Instrumentation.count('alpha.candidate_pairs', tested)
+    Instrumentation.count('alpha.places_kept', kept)
+
+
+def maximal_pairs(pairs):
+    """Returns the pairs (A, B) of bitmasks not contained in another pair.
+
+    (A1, B1) is contained in (A2, B2) when A1 is a subset of A2 and B1 is a
+    subset of B2. Each pair is packed into one bitset, the pairs are visited
+    from largest to smallest and every kept pair is indexed by its bits, so a
+    candidate is only compared with the kept pairs sharing its rarest bit.
+    Empty masks are allowed; a pair of two empty masks is only kept alone.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return []
+    # B goes above every bit used by A, so containment is a single subset test
+    shift = max(A.bit_length() for A, _ in pairs)
+    packed = sorted(((A | B << shift, (A, B)) for A, B in pairs),
+                    key=lambda item: item[0].bit_count(), reverse=True)
+    index = {}  # bit -> packed kept pairs with that bit set
+    kept = []
+    for mask, pair in packed:
+        positions = list(bits(mask))
+        if not positions:
+            # (empty, empty) is contained in every other pair, and comes last
+            if not kept:
+                kept.append(pair)
+            continue
+        # Every superset contains all our bits, so the shortest list suffices
+        candidates = min((index.get(bit, ()) for bit in positions), key=len)
+        if any(mask & other == mask for other in candidates):
+            continue
+        kept.append(pair)
+        for bit in positions:
+            index.setdefault(bit, []).append(mask)
+    return kept
 
-class PetriNet:
-    def __init__(self):
-        self.p = []  # Set of places
-        self.t = {}  # Set of transitions (name to ID mapping)
-        self.f = []  # Set of directed arcs (edges)
-        self.m = {}  # Current marking (tokens in places), mapping place name to count
-        self.initial_marking = {}  # Store initial marking to reset later
-
-    def add_place(self, name):
-        if name not in self.p:
-            self.p.append(name)
-
-    def add_transition(self, name, id):
-        if name not in self.t:
-            self.t[name] = id
-
-    def add_edge(self, source, target):
-        if (source in self.p and target in self.t.values()) or (source in self.t.values() and target in self.p):
-            self.f.append((source, target))
-        else:
-            print(f"Invalid edge: source {source} or target {target} is not valid.")
-        return self
-
-    def get_tokens(self, place):
-        return self.m.get(place, 0)
-
-    def is_enabled(self, transition):
-        for edge in self.f:
-            if edge[1] == transition:  # Edge from place to transition
-                if self.get_tokens(edge[0]) == 0:
-                    return False
-        return True
-
-    def fire_transition(self, transition):
-        if not self.is_enabled(transition):
-            print(f"Transition {transition} is not enabled.")
-            return
-        # Remove tokens from input places
-        for edge in self.f:
-            if edge[1] == transition:
-                if self.m[edge[0]] > 0:
-                    self.m[edge[0]] -= 1
-        # Add tokens to output places
-        for edge in self.f:
-            if edge[0] == transition:
-                self.m[edge[1]] = self.m.get(edge[1], 0) + 1
-
-        # consumed = 0
-        # produced = 0
-        # missing = 0
-        # # Check if transition is enabled
-        # is_enabled = True
-        # for edge in self.f:
-        #     if edge[1] == transition:
-        #         place = edge[0]
-        #         required_tokens = 1  # Assuming weight is 1
-        #         available_tokens = self.get_tokens(place)
-        #         if available_tokens < required_tokens:
-        #             missing += required_tokens - available_tokens
-        #             is_enabled = False
-        # if not is_enabled:
-        #     return consumed, produced, missing
-        # # Remove tokens from input places
-        # for edge in self.f:
-        #     if edge[1] == transition:
-        #         required_tokens = 1  # Assuming weight is 1
-        #         self.m[edge[0]] -= required_tokens
-        #         consumed += required_tokens
-        # # Add tokens to output places
-        # for edge in self.f:
-        #     if edge[0] == transition:
-        #         produced_tokens = 1  # Assuming weight is 1
-        #         self.m[edge[1]] = self.m.get(edge[1], 0) + produced_tokens
-        #         produced += produced_tokens
-        
-        # return consumed, produced, missing
-
-    def add_marking(self, place, tokens=1):
-        """Sets the token count for a place and stores the initial marking."""
-        if place in self.p:
-            self.m[place] = tokens
-            self.initial_marking[place] = tokens
-
-    def reset_marking(self):
-        """Reset the token marking to the initial marking."""
-        self.m = self.initial_marking.copy()
-
-    def transition_name_to_id(self, name):
-        return self.t.get(name)
 
 def alpha(log):
     # Step 1: Extract T_W, T_I, T_O
     T_W = set()
     T_I = set()
     T_O = set()
-    W = []
-    for case_id, events in log.items():
-        events.sort(key=lambda x: x['time:timestamp'])
-        trace = [event['concept:name'] for event in events]
-        if trace:
-            W.append(trace)
-            T_W.update(trace)
-            T_I.add(trace[0])
-            T_O.add(trace[-1])
-
-    # Step 2: Build directly follows relation
-    directly_follows_pairs = set()
-    for trace in W:
-        for i in range(len(trace) - 1):
-            directly_follows_pairs.add((trace[i], trace[i + 1]))
-
-    # Step 3: Build footprint matrix
-    T_W_list = list(T_W)
-    footprint = {}
-    for a in T_W_list:
-        for b in T_W_list:
-            if (a, b) in directly_follows_pairs and (b, a) not in directly_follows_pairs:
-                footprint[(a, b)] = '>'
-            elif (b, a) in directly_follows_pairs and (a, b) not in directly_follows_pairs:
-                footprint[(a, b)] = '<'
-            elif (a, b) in directly_follows_pairs and (b, a) in directly_follows_pairs:
-                footprint[(a, b)] = '||'
-            else:
-                footprint[(a, b)] = '#'
-
-    # Step 4: Generate X_W
-    def get_non_empty_subsets(s):
-        s_list = list(s)
-        subsets = []
-        for r in range(1, len(s_list)+1):
-            subsets.extend(combinations(s_list, r))
-        return subsets
-
-    A_subsets = get_non_empty_subsets(T_W)
-    B_subsets = get_non_empty_subsets(T_W)
-    X_W = set()
-    for A in A_subsets:
-        for B in B_subsets:
-            if not A or not B:
-                continue
-            condition_satisfied = True
-            for a in A:
-                for b in B:
-                    if footprint.get((a, b)) != '>':
-                        condition_satisfied = False
-                        break
-                if not condition_satisfied:
-                    break
-            if not condition_satisfied:
-                continue
-            for i in range(len(A)):
-                for j in range(i+1, len(A)):
-                    if footprint.get((A[i], A[j])) != '#' or footprint.get((A[j], A[i])) != '#':
-                        condition_satisfied = False
-                        break
-                if not condition_satisfied:
-                    break
-            if not condition_satisfied:
-                continue
-            for i in range(len(B)):
-                for j in range(i+1, len(B)):
-                    if footprint.get((B[i], B[j])) != '#' or footprint.get((B[j], B[i])) != '#':
-                        condition_satisfied = False
-                        break
-                if not condition_satisfied:
-                    break
-            if condition_satisfied:
-                X_W.add((frozenset(A), frozenset(B)))
-
-    # Step 5: Generate Y_W
-    Y_W = set(X_W)
-    for (A1, B1) in X_W:
-        for (A2, B2) in X_W:
-            if (A1 != A2 or B1 != B2) and A1.issubset(A2) and B1.issubset(B2):
-                Y_W.discard((A1, B1))
-                break
+    # Work on interned activity codes; names are only needed for the net
+    with Instrumentation.stage('alpha.activities'):
+        log = as_event_log(log)
+        names = log.activities
+        for trace in log.variants():
+            if trace:
+                T_W.update(trace)
+                T_I.add(trace[0])
+                T_O.add(trace[-1])
+
+    # Steps 2 and 3: Build the footprint from the directly-follows counts
+    with Instrumentation.stage('alpha.footprint'):
+        footprint = Footprint.from_log(log)
+
+    # Steps 4 and 5: Generate the maximal pairs Y_W directly
+    with Instrumentation.stage('alpha.places'):
+        Y_W = set()
+        for A, B in maximal_place_pairs(footprint.causal, footprint.reverse_causal, footprint.unrelated):
+            Y_W.add((frozenset(bits(A)), frozenset(bits(B))))
 
     # Step 6: Construct P_W and F_W
-    pn = PetriNet()
-    for t in T_W:
-        pn.add_transition(t, t)
-    pn.add_place('i_W')
-    pn.add_place('o_W')
-    place_counter = 0
-    place_map = {}
-    for (A, B) in Y_W:
-        place_name = f'p_{place_counter}'
-        place_counter += 1
-        pn.add_place(place_name)
-        place_map[(A, B)] = place_name
-    for t in T_I:
-        pn.add_edge('i_W', t)
-    for t in T_O:
-        pn.add_edge(t, 'o_W')
-    for (A, B) in Y_W:
-        place_name = place_map[(A, B)]
-        for a in A:
-            pn.add_edge(a, place_name)
-        for b in B:
-            pn.add_edge(place_name, b)
-    pn.add_marking('i_W', tokens=1)
+    with Instrumentation.stage('alpha.net'):
+        pn = PetriNet()
+        pn.add_transitions((names[t], names[t]) for t in T_W)
+        place_names = [f'p_{place_counter}' for place_counter in range(len(Y_W))]
+        pn.add_places(['i_W', 'o_W'] + place_names)
+        arcs = [('i_W', names[t]) for t in T_I]
+        arcs.extend((names[t], 'o_W') for t in T_O)
+        for (A, B), place_name in zip(Y_W, place_names):
+            arcs.extend((names[a], place_name) for a in A)
+            arcs.extend((place_name, names[b]) for b in B)
+        pn.add_arcs(arcs)
+        pn.set_initial_marking('i_W', tokens=1)
     return pn
 
-def read_from_file(filename):
-    # Parse the XES file
-    tree = ET.parse(filename)
-    root = tree.getroot()
-
-    # Define the XES namespace (usually 'xes' but can vary)
-    namespace = {'xes': 'http://www.xes-standard.org/'}
-
-    # The log dictionary will map case_id to its list of events
-    log = defaultdict(list)
-
-    # Find all trace elements
-    traces = root.findall("xes:trace", namespace)
-
-    # Process each trace
-    for trace in traces:
-        # Get the case_id (concept:name of the trace)
-        case_id = trace.find("xes:string[@key='concept:name']", namespace)
-        if case_id is not None:
-            case_id_value = case_id.attrib['value']
-        else:
-            case_id_value = "Unknown"  # Default if no concept:name found
-
-        # List to hold the events for this case_id
-        events = []
-
-        # Extract each event within the trace
-        for event in trace.findall("xes:event", namespace):
-            event_dict = {}
-
-            # Iterate over all attributes of the event
-            for attribute in event:
-                key = attribute.attrib['key']
-                value = attribute.attrib['value']
-
-                # Type casting based on the key
-                if key == "time:timestamp":
-                    # Convert string to a datetime object
-                    try:
-                        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
-                        value = value.replace(tzinfo=None)
-                    except ValueError:
-                        pass  # If there's an issue, keep the original value
-
-                elif key == "cost" or key == "urgency":
-                    # Convert to integer
-                    try:
-                        value = int(value)
-                    except ValueError:
-                        pass  # If there's an issue, keep the original value
-
-                # Store the processed value in the event dictionary
-                event_dict[key] = value
-
-            # Add this event to the list of events for the current trace (case_id)
-            events.append(event_dict)
-
-        # Add events for the current trace (case_id) to the log
-        log[case_id_value] = events
-
-    return log
-
-def fitness_token_replay(log, pn):
-    total_produced = 0
-    total_consumed = 0
-    total_missing = 0
-    total_remaining = 0
-
-    # Process each case in the log
-    for case_id, events in log.items():
-        # Reset the marking to the initial state
-        pn.reset_marking()
-
-        # Sort the events by timestamp for each case
-        events.sort(key=lambda x: x["time:timestamp"])
-
-        produced = 0
-        consumed = 0
-        missing = 0
-        # Iterate through the events to replay the trace
-        for event in events:
-            task = event["concept:name"]
-            cons, prod, miss = pn.fire_transition(task)
-            consumed += cons
-            produced += prod
-            missing += miss
-        # After processing the trace, count the remaining tokens (excluding 'o_W')
-        remaining_tokens = sum(pn.get_tokens(place) for place in pn.p if place != 'o_W')
-        total_remaining += remaining_tokens
-
-        total_produced += produced
-        total_consumed += consumed
-        total_missing += missing
+def fitness_token_replay(log, pn, workers=1):
+    # Replay the prefix tree of the log's variants on the compiled net
+    with Instrumentation.stage('replay'):
+        total_produced, total_consumed, total_missing, total_remaining = replay_totals(pn.compile(), log,
+                                                                                       workers=workers)
 
     # Now compute the fitness
     if (total_consumed + total_produced) == 0:
@@ -308,10 +164,11 @@ def fitness_token_replay(log, pn):
 
 if __name__ == "__main__":
 
-    log = read_from_file("extension-log-4.xes")
-    log_noisy = read_from_file("extension-log-noisy-4.xes")
+    log = load_log("extension-log-4.xes")
+    log_noisy = load_log("extension-log-noisy-4.xes")
 
-    mined_model = alpha(log)
+    # Reuse the net mined from a log with the same variants in an earlier run
+    mined_model = load_model(log, alpha)
     print(round(fitness_token_replay(log, mined_model), 5))
-    mined_model.add_marking('i_W', tokens=1)
+    mined_model.set_initial_marking('i_W', tokens=1)
     print(round(fitness_token_replay(log_noisy, mined_model), 5))
@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from Alignments import alignment_fitness
+from Alpha import alpha, fitness_token_replay
+from DependencyGraphs import dependency_graph_file
+from EventLog import EventLog
+from LogGenerator import generate_log
+from PetriNet import PetriNet
+from XesReader import read_event_log, read_from_file
+
+# The bundled logs live next to this file, whatever the working directory
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Bundled logs used as fixed reference points: (name, clean log, noisy log)
+REFERENCE_LOGS = [('extension-log-4', os.path.join(ROOT, 'extension-log-4.xes'),
+                   os.path.join(ROOT, 'extension-log-noisy-4.xes'))]
+
+
+def make_cold(args):
+    """Drops what earlier runs cached on the arguments: variant indexes and compiled nets."""
+    for arg in args:
+        if isinstance(arg, EventLog):
+            arg.reset_variants()
+        elif isinstance(arg, PetriNet):
+            arg.compiled = None
+
+
+def measure(function, *args):
+    """Runs function twice: once for wall time, once under tracemalloc for peak memory.
+
+    Tracing slows Python down, so the timing run is kept free of it. Both
+    runs start cold, so the work a stage caches on its inputs is measured
+    every time and does not leak into later stages.
+    Returns (result, seconds, peak bytes).
+    """
+    make_cold(args)
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+    make_cold(args)
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def run_stages(clean_file, noisy_file):
+    """Benchmarks every stage on one pair of logs and returns a record per stage."""
+    records = []
+
+    def record(stage, function, *args, events):
+        result, seconds, peak = measure(function, *args)
+        records.append({
+            'stage': stage,
+            'seconds': seconds,
+            'peak_bytes': peak,
+            'events': events,
+            'events_per_second': events / seconds if seconds else None,
+        })
+        return result
+
+    # The stages share the logs, but measure drops their cached variant
+    # index before every run, so each stage pays for it as if it ran alone
+    log = read_event_log(clean_file)
+    noisy = read_event_log(noisy_file)
+    record('read_from_file', read_from_file, clean_file, events=log.num_events)
+    record('read_event_log', read_event_log, clean_file, events=log.num_events)
+    model = record('alpha', alpha, log, events=log.num_events)
+    record('dependency_graph_file', dependency_graph_file, log, events=log.num_events)
+    record('fitness_token_replay', fitness_token_replay, noisy, model, events=noisy.num_events)
+    record('alignment_fitness', alignment_fitness, noisy, model, events=noisy.num_events)
+    return records
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=ROOT).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark reading, discovery, DFG, replay and alignments.')
+    parser.add_argument('--cases', type=int, nargs='+', default=[100, 1000, 10000],
+                        help='synthetic log sizes to run, in cases')
+    parser.add_argument('--activities', type=int, default=10)
+    parser.add_argument('--concurrency', type=float, default=0.3)
+    parser.add_argument('--noise', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-reference', action='store_true', help='skip the bundled extension logs')
+    parser.add_argument('--output', help='append the JSON lines to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    # Every record says what it measured, so files from two versions can be compared
+    run = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    out = open(args.output, 'a') if args.output else sys.stdout
+    try:
+        if not args.no_reference:
+            for name, clean_file, noisy_file in REFERENCE_LOGS:
+                for record in run_stages(clean_file, noisy_file):
+                    out.write(json.dumps({**run, 'log': name, **record}) + '\n')
+        with tempfile.TemporaryDirectory() as directory:
+            for cases in args.cases:
+                params = {'cases': cases, 'activities': args.activities, 'concurrency': args.concurrency,
+                          'noise': args.noise, 'seed': args.seed}
+                clean_file = os.path.join(directory, 'clean.xes')
+                noisy_file = os.path.join(directory, 'noisy.xes')
+                generate_log(clean_file, cases, args.activities, args.concurrency, 0.0, args.seed)
+                generate_log(noisy_file, cases, args.activities, args.concurrency, args.noise, args.seed)
+                for record in run_stages(clean_file, noisy_file):
+                    out.write(json.dumps({**run, 'log': 'synthetic', **params, **record}) + '\n')
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
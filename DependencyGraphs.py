@@ -1,6 +1,10 @@
-from collections import defaultdict
+from collections import OrderedDict, defaultdict, deque
 from datetime import datetime
 
+from EventLog import as_event_log
+import Instrumentation
+from XesReader import read_from_file
+
 def log_as_dictionary(log):
     # Create a dictionary where the key is the case id and the value is a list of events
     log_dict = defaultdict(list)
@@ -26,102 +30,137 @@ def log_as_dictionary(log):
 
 
 def dependency_graph_inline(log):
-    # Create a dictionary to store the dependency graph
-    dependency_graph = defaultdict(lambda: defaultdict(int))
-    
-    # Process each case in the log
-    for case_id, events in log.items():
-        # Sort the events by timestamp for each case
-        events.sort(key=lambda x: x["timestamp"])
-        
-        # Iterate through the events to establish relationships
-        for i in range(len(events) - 1):
-            source_activity = events[i]["task"]
-            target_activity = events[i + 1]["task"]
-            dependency_graph[source_activity][target_activity] += 1
-    
-    return dependency_graph
-
-def read_from_file(filename):
-    # Parse the XES file
-    tree = ET.parse(filename)
-    root = tree.getroot()
-
-    # Define the XES namespace (usually 'xes' but can vary)
-    namespace = {'xes': 'http://www.xes-standard.org/'}
-
-    # The log dictionary will map case_id to its list of events
-    log = defaultdict(list)
-
-    # Find all trace elements
-    traces = root.findall("xes:trace", namespace)
-
-    # Process each trace
-    for trace in traces:
-        # Get the case_id (concept:name of the trace)
-        case_id = trace.find("xes:string[@key='concept:name']", namespace)
-        if case_id is not None:
-            case_id_value = case_id.attrib['value']
-        else:
-            case_id_value = "Unknown"  # Default if no concept:name found
-
-        # List to hold the events for this case_id
-        events = []
-
-        # Extract each event within the trace
-        for event in trace.findall("xes:event", namespace):
-            event_dict = {}
-
-            # Iterate over all attributes of the event
-            for attribute in event:
-                key = attribute.attrib['key']
-                value = attribute.attrib['value']
-
-                # Type casting based on the key
-                if key == "time:timestamp":
-                    # Convert string to a datetime object
-                    try:
-                        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
-                        value = value.replace(tzinfo=None)
-                    except ValueError:
-                        pass  # If there's an issue, keep the original value
-
-                elif key == "cost" or key == "urgency":
-                    # Convert to integer
-                    try:
-                        value = int(value)
-                    except ValueError:
-                        pass  # If there's an issue, keep the original value
-
-                # Store the processed value in the event dictionary
-                event_dict[key] = value
-
-            # Add this event to the list of events for the current trace (case_id)
-            events.append(event_dict)
-
-        # Add events for the current trace (case_id) to the log
-        log[case_id_value] = events
-
-    return log
-
+    # The inline format names its fields task, timestamp and user
+    return dependency_graph_file(as_event_log(log, activity_key="task", timestamp_key="timestamp",
+                                              resource_key="user"))
 
 def dependency_graph_file(log):
     # Create a dictionary to store the dependency graph
-    dependency_graph = defaultdict(lambda: defaultdict(int))
-    
-    # Process each case in the log
-    for case_id, events in log.items():
-        # Sort the events by timestamp for each case
-        events.sort(key=lambda x: x["time:timestamp"])
-        
-        # Iterate through the events to establish relationships
-        for i in range(len(events) - 1):
-            source_activity = events[i]["concept:name"]
-            target_activity = events[i + 1]["concept:name"]
-            dependency_graph[source_activity][target_activity] += 1
-    
-    return dependency_graph
-
+    return dependency_matrix(log).to_dict()
+
+
+def dependency_matrix(log):
+    """Directly-follows counts of a log as a DependencyMatrix."""
+    # Count directly-follows pairs on activity codes, once per variant
+    with Instrumentation.stage('dependency_graph'):
+        log = as_event_log(log)
+        matrix = DependencyMatrix(log.activities)
+        counts = matrix.counts
+        for trace, cases in log.variants().items():
+            for pair in zip(trace, trace[1:]):
+                counts[pair] = counts.get(pair, 0) + len(cases)
+    return matrix
+
+
+class DependencyMatrix:
+    """Dependency graph as a sparse count matrix over interned activity indices.
+
+    Only non-zero cells are stored, keyed by (row, column). Matrices computed
+    on separate partitions of a log can be combined with merge(), and the
+    whole object pickles, so partial results can come from worker processes.
+    """
+
+    def __init__(self, activities=()):
+        self.activities = list(activities)  # Activity name for every index
+        self.activity_index = {name: i for i, name in enumerate(self.activities)}
+        self.counts = {}  # (source index, target index) to count
+
+    def index(self, name):
+        """Returns the index of an activity, adding it if it is new."""
+        i = self.activity_index.get(name)
+        if i is None:
+            i = self.activity_index[name] = len(self.activities)
+            self.activities.append(name)
+        return i
+
+    def add(self, source, target, count=1):
+        pair = (self.index(source), self.index(target))
+        self.counts[pair] = self.counts.get(pair, 0) + count
+
+    def get(self, source, target):
+        i = self.activity_index.get(source)
+        j = self.activity_index.get(target)
+        return self.counts.get((i, j), 0)
+
+    def merge(self, other):
+        """Adds the counts of another matrix into this one and returns self."""
+        mapping = [self.index(name) for name in other.activities]
+        counts = self.counts
+        for (i, j), count in other.counts.items():
+            pair = (mapping[i], mapping[j])
+            counts[pair] = counts.get(pair, 0) + count
+        return self
+
+    def to_dict(self):
+        """Nested dictionary form, as returned by dependency_graph_file."""
+        names = self.activities
+        dependency_graph = defaultdict(lambda: defaultdict(int))
+        for (i, j), count in self.counts.items():
+            dependency_graph[names[i]][names[j]] = count
+        return dependency_graph
+
+    @classmethod
+    def from_dict(cls, dependency_graph):
+        matrix = cls()
+        for source, targets in dependency_graph.items():
+            for target, count in targets.items():
+                if count:
+                    matrix.add(source, target, count)
+        return matrix
+
+
+class IncrementalDFG:
+    """Directly-follows graph kept up to date from a stream of events.
+
+    Events are added one at a time, in timestamp order. Only the last
+    activity of every case is kept, so each event updates one edge count.
+    With a window (a timedelta), edges older than the newest timestamp minus
+    the window are evicted again, and so is the state of cases that have been
+    idle for longer than the window.
+    """
+
+    def __init__(self, window=None):
+        self.window = window
+        self.counts = defaultdict(int)  # (source, target) to count
+        self.last = OrderedDict()  # case_id to (activity, timestamp), least recent first
+        self.history = deque()  # (timestamp, edge) of counted edges, only with a window
+
+    def add_event(self, case_id, activity, timestamp):
+        # Evict first, so whether the case's previous event still counts does
+        # not depend on when other cases happened to send events
+        if self.window is not None:
+            self.evict(timestamp - self.window)
+        previous = self.last.pop(case_id, None)
+        self.last[case_id] = (activity, timestamp)
+        if previous is not None:
+            edge = (previous[0], activity)
+            self.counts[edge] += 1
+            if self.window is not None:
+                self.history.append((timestamp, edge))
+
+    def add_events(self, events):
+        """Adds (case_id, activity, timestamp) triples in order."""
+        for case_id, activity, timestamp in events:
+            self.add_event(case_id, activity, timestamp)
+
+    def evict(self, horizon):
+        """Forgets the edges and idle cases from before horizon."""
+        history = self.history
+        while history and history[0][0] < horizon:
+            _, edge = history.popleft()
+            self.counts[edge] -= 1
+            if not self.counts[edge]:
+                del self.counts[edge]
+        last = self.last
+        while last and next(iter(last.values()))[1] < horizon:
+            last.popitem(last=False)
+
+    def snapshot(self):
+        """Current graph in the nested dictionary form of dependency_graph_file."""
+        dependency_graph = defaultdict(lambda: defaultdict(int))
+        for (source, target), count in self.counts.items():
+            dependency_graph[source][target] = count
+        return dependency_graph
 
 
 if __name__  == "__main__":
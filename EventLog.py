@@ -0,0 +1,246 @@
+from array import array
+from datetime import datetime, timedelta
+from itertools import islice
+
+# Timestamps are stored as int64 microseconds since this (naive) epoch
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+NO_RESOURCE = -1  # Code used for events without an org:resource
+# Array columns of a log with their typecodes
+COLUMNS = (('activity', 'i'), ('resource', 'i'), ('timestamp', 'q'), ('offsets', 'q'))
+
+
+def timestamp_to_int(value):
+    return (value - EPOCH) // MICROSECOND
+
+
+def int_to_timestamp(value):
+    return EPOCH + timedelta(microseconds=value)
+
+
+def is_sorted(values):
+    """O(n) check that a sequence is in non-decreasing order."""
+    return all(a <= b for a, b in zip(values, islice(values, 1, None)))
+
+
+class EventLog:
+    """Columnar event log with interned activity and resource codes.
+
+    Events of all cases are stored back to back in compact arrays, ordered by
+    timestamp inside each case. The events of case i are the positions
+    offsets[i] to offsets[i + 1]; activities[code] and resources[code] give
+    the names behind the integer codes.
+    """
+
+    def __init__(self):
+        self.case_ids = []  # Case id of every trace, in log order
+        self.activities = []  # Activity name for every activity code
+        self.resources = []  # Resource name for every resource code
+        self.activity_codes = {}  # Activity name to code
+        self.resource_codes = {}  # Resource name to code
+        self.activity = array('i')  # Activity code of every event
+        self.resource = array('i')  # Resource code of every event
+        self.timestamp = array('q')  # Timestamp of every event
+        self.offsets = array('q', [0])  # Start of every trace, plus the end
+        self._variants = None  # Built on first use by variants()
+        # Whether the events of every case are in timestamp order. Logs built
+        # with add_case always are; logs assembled from raw columns must say so
+        # or be put in order with sort_cases().
+        self.ordered = True
+
+    def __len__(self):
+        return len(self.case_ids)
+
+    @property
+    def num_events(self):
+        return self.offsets[-1]
+
+    def activity_code(self, name):
+        """Returns the code of an activity, interning it if it is new."""
+        code = self.activity_codes.get(name)
+        if code is None:
+            code = self.activity_codes[name] = len(self.activities)
+            self.activities.append(name)
+        return code
+
+    def resource_code(self, name):
+        """Returns the code of a resource, interning it if it is new."""
+        if name is None:
+            return NO_RESOURCE
+        code = self.resource_codes.get(name)
+        if code is None:
+            code = self.resource_codes[name] = len(self.resources)
+            self.resources.append(name)
+        return code
+
+    def make_writable(self):
+        """Copies columns that are read-only views, e.g. of a memory-mapped cache file, into arrays.
+
+        Every method that changes the columns calls this first, so a log
+        loaded from the cache can be extended like any other.
+        """
+        for name, typecode in COLUMNS:
+            column = getattr(self, name)
+            if not isinstance(column, array):
+                setattr(self, name, array(typecode, column))
+
+    def add_case(self, case_id, events, activity_key='concept:name',
+                 timestamp_key='time:timestamp', resource_key='org:resource'):
+        """Appends one case given as a list of event dictionaries."""
+        self.make_writable()
+        # Events usually arrive in order; only then is sorting skipped.
+        # Sort a copy so the caller's events are left untouched
+        if not is_sorted([event[timestamp_key] for event in events]):
+            events = sorted(events, key=lambda x: x[timestamp_key])
+        for event in events:
+            self.activity.append(self.activity_code(event[activity_key]))
+            self.resource.append(self.resource_code(event.get(resource_key)))
+            self.timestamp.append(timestamp_to_int(event[timestamp_key]))
+        self.case_ids.append(case_id)
+        self.offsets.append(len(self.activity))
+        self._variants = None
+
+    @classmethod
+    def from_cases(cls, cases, **keys):
+        """Builds a log from (case_id, events) pairs, e.g. a trace stream."""
+        log = cls()
+        for case_id, events in cases:
+            log.add_case(case_id, events, **keys)
+        return log
+
+    @classmethod
+    def from_columns(cls, case_ids, activities, activity, timestamp, offsets,
+                     resources=(), resource=None, ordered=None):
+        """Builds a log from ready-made columns, e.g. produced by a vectorized converter.
+
+        activity and resource must be array('i'), timestamp and offsets
+        array('q'). resource defaults to NO_RESOURCE for every event. With
+        ordered=None the timestamp order of every case is checked.
+        """
+        log = cls()
+        log.case_ids = list(case_ids)
+        log.activities = list(activities)
+        log.resources = list(resources)
+        log.activity_codes = {name: code for code, name in enumerate(log.activities)}
+        log.resource_codes = {name: code for code, name in enumerate(log.resources)}
+        log.activity = activity
+        log.timestamp = timestamp
+        log.offsets = offsets
+        log.resource = resource if resource is not None else array('i', [NO_RESOURCE]) * len(activity)
+        if ordered is None:
+            log.check_order()
+        else:
+            log.ordered = ordered
+        return log
+
+    def extend(self, other):
+        """Appends all cases of another log, translating its codes to ours."""
+        self.make_writable()
+        activity_map = array('i', map(self.activity_code, other.activities))
+        # NO_RESOURCE is -1, so it picks the extra entry at the end
+        resource_map = array('i', map(self.resource_code, other.resources))
+        resource_map.append(NO_RESOURCE)
+        base = len(self.activity)
+        self.activity.extend(array('i', map(activity_map.__getitem__, other.activity)))
+        self.resource.extend(array('i', map(resource_map.__getitem__, other.resource)))
+        self.timestamp.extend(other.timestamp)
+        self.offsets.extend(base + offset for offset in other.offsets[1:])
+        self.case_ids.extend(other.case_ids)
+        self.ordered = self.ordered and other.ordered
+        self._variants = None
+
+    def check_order(self):
+        """Sets and returns the ordered flag by checking every case in O(n)."""
+        timestamp = self.timestamp
+        offsets = self.offsets
+        self.ordered = all(is_sorted(timestamp[offsets[i]:offsets[i + 1]]) for i in range(len(self)))
+        return self.ordered
+
+    def sort_cases(self):
+        """Puts the events of every case in timestamp order, touching only unsorted cases."""
+        if self.check_order():
+            return
+        columns = (('activity', 'i'), ('resource', 'i'), ('timestamp', 'q'))
+        self.make_writable()
+        offsets = self.offsets
+        for i in range(len(self)):
+            start, end = offsets[i], offsets[i + 1]
+            timestamps = self.timestamp[start:end]
+            if is_sorted(timestamps):
+                continue
+            # Stable, like sorting the event dictionaries by timestamp
+            order = sorted(range(end - start), key=timestamps.__getitem__)
+            for name, typecode in columns:
+                column = getattr(self, name)
+                values = column[start:end]
+                column[start:end] = array(typecode, [values[k] for k in order])
+        self.ordered = True
+        self._variants = None
+
+    def trace(self, index):
+        """Activity codes of one case."""
+        return self.activity[self.offsets[index]:self.offsets[index + 1]]
+
+    def traces(self):
+        """Yields the activity codes of every case, in log order."""
+        activity = self.activity
+        offsets = self.offsets
+        for i in range(len(self.case_ids)):
+            yield activity[offsets[i]:offsets[i + 1]]
+
+    def variants(self):
+        """Maps every distinct activity sequence to the positions of its cases.
+
+        The frequency of a variant is the number of its cases. The index is
+        built once and kept until cases are added to the log.
+        """
+        if self._variants is None:
+            variants = {}
+            for i, trace in enumerate(self.traces()):
+                variants.setdefault(tuple(trace), []).append(i)
+            self._variants = variants
+        return self._variants
+
+    def reset_variants(self):
+        """Drops the variant index, so the next variants() call builds it again."""
+        self._variants = None
+
+    def events(self, index):
+        """Decodes one case back into the event dictionaries used elsewhere."""
+        events = []
+        for pos in range(self.offsets[index], self.offsets[index + 1]):
+            event = {
+                'concept:name': self.activities[self.activity[pos]],
+                'time:timestamp': int_to_timestamp(self.timestamp[pos]),
+            }
+            if self.resource[pos] != NO_RESOURCE:
+                event['org:resource'] = self.resources[self.resource[pos]]
+            events.append(event)
+        return events
+
+    def to_dict(self):
+        """Converts the log to the case_id to events dictionary form."""
+        return {case_id: self.events(i) for i, case_id in enumerate(self.case_ids)}
+
+
+def iter_cases(log):
+    """Iterates (case_id, events) pairs of a dictionary log or of a trace stream."""
+    if isinstance(log, EventLog):
+        return ((case_id, log.events(i)) for i, case_id in enumerate(log.case_ids))
+    if hasattr(log, 'items'):
+        return iter(log.items())
+    return iter(log)
+
+
+def as_event_log(log, **keys):
+    """Returns log as an EventLog in timestamp order.
+
+    Dictionary logs and trace streams are converted, sorting each case once
+    without changing the caller's events. An EventLog is only sorted if it
+    does not already carry the ordered flag.
+    """
+    if isinstance(log, EventLog):
+        if not log.ordered:
+            log.sort_cases()
+        return log
+    return EventLog.from_cases(iter_cases(log), **keys)
@@ -0,0 +1,82 @@
+from array import array
+
+from EventLog import as_event_log
+
+# Relation codes stored in the footprint matrix, and their usual symbols
+UNRELATED = 0
+CAUSAL = 1
+REVERSE_CAUSAL = 2
+PARALLEL = 3
+SYMBOLS = ('#', '>', '<', '||')
+
+
+def directly_follows_counts(log):
+    """Returns the |T| x |T| directly-follows count matrix of a log, row major."""
+    n = len(log.activities)
+    counts = array('q', bytes(8 * n * n))
+    for trace, cases in log.variants().items():
+        frequency = len(cases)
+        for a, b in zip(trace, trace[1:]):
+            counts[a * n + b] += frequency
+    return counts
+
+
+class Footprint:
+    """Footprint matrix of a log over its activity codes.
+
+    Every relation is kept as one bitmask per activity, derived from the
+    directly-follows rows with whole-row bit operations, and as a dense
+    matrix of relation codes for O(1) lookups of single pairs.
+    """
+
+    def __init__(self, activities, counts):
+        self.activities = activities
+        n = self.n = len(activities)
+        # Row a of follows holds every b with a > b at least once
+        follows = [0] * n
+        precedes = [0] * n
+        for a in range(n):
+            row = 0
+            for b, count in enumerate(counts[a * n:(a + 1) * n]):
+                if count:
+                    row |= 1 << b
+                    precedes[b] |= 1 << a
+            follows[a] = row
+
+        everything = (1 << n) - 1
+        self.causal = [follows[a] & ~precedes[a] for a in range(n)]
+        self.reverse_causal = [precedes[a] & ~follows[a] for a in range(n)]
+        self.parallel = [follows[a] & precedes[a] for a in range(n)]
+        # '#' with every other activity; an activity is never listed as its own
+        self.unrelated = [everything & ~(follows[a] | precedes[a]) & ~(1 << a) for a in range(n)]
+
+        # Unrelated is 0, so only pairs that follow each other need writing
+        self.matrix = bytearray(n * n)
+        for a in range(n):
+            base = a * n
+            for relation, rows in ((CAUSAL, self.causal), (REVERSE_CAUSAL, self.reverse_causal),
+                                   (PARALLEL, self.parallel)):
+                row = rows[a]
+                while row:
+                    low = row & -row
+                    self.matrix[base + low.bit_length() - 1] = relation
+                    row ^= low
+
+    @classmethod
+    def from_log(cls, log):
+        log = as_event_log(log)
+        return cls(log.activities, directly_follows_counts(log))
+
+    def relation(self, a, b):
+        """Relation code between two activity codes."""
+        return self.matrix[a * self.n + b]
+
+    def symbol(self, a, b):
+        """Footprint symbol between two activity codes, one of '#', '>', '<', '||'."""
+        return SYMBOLS[self.matrix[a * self.n + b]]
+
+    def to_dict(self):
+        """Footprint as a dictionary from (name, name) pairs to symbols."""
+        names = self.activities
+        return {(names[a], names[b]): self.symbol(a, b)
+                for a in range(self.n) for b in range(self.n)}
@@ -0,0 +1,59 @@
+import json
+import time
+from contextlib import contextmanager
+
+# Instrumentation is off unless enable() is called. Hot loops keep their
+# counts in local variables and report them once per call, so the cost when
+# disabled is one flag check per stage rather than per event.
+enabled = False
+timings = {}  # Stage name to total seconds
+calls = {}  # Stage name to number of runs
+counters = {}  # Counter name to total
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    timings.clear()
+    calls.clear()
+    counters.clear()
+
+
+@contextmanager
+def stage(name):
+    """Times the enclosed block under name when instrumentation is enabled."""
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+        calls[name] = calls.get(name, 0) + 1
+
+
+def count(name, amount=1):
+    if enabled:
+        counters[name] = counters.get(name, 0) + amount
+
+
+def report():
+    """Collected timings and counters as a dictionary."""
+    return {
+        'stages': {name: {'seconds': timings[name], 'calls': calls[name]} for name in timings},
+        'counters': dict(counters),
+    }
+
+
+def write_report(filename):
+    with open(filename, 'w') as f:
+        json.dump(report(), f, indent=2)
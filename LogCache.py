@@ -0,0 +1,151 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from EventLog import EventLog
+from XesReader import read_event_log, read_event_log_parallel
+
+DEFAULT_CACHE_DIR = '.logcache'
+DEFAULT_MAX_BYTES = 1 << 30  # Total size the cache directory may grow to
+
+# Cache files start with this header, followed by the timestamp and offsets
+# columns (int64), the activity and resource columns (int32) and a JSON
+# table with the case ids and the activity and resource names. Columns are
+# written in native byte order, which is recorded in the magic.
+MAGIC = b'PMLOG2' + sys.byteorder[0].encode() + b'\0'
+# magic, size, mtime_ns, cases, events, names length, ordered flag, digest
+HEADER = struct.Struct('<8sqqqqqq32s')
+
+
+def file_digest(filename):
+    """blake2b digest of a file's content, read in blocks."""
+    digest = hashlib.blake2b(digest_size=32)
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+def cache_path(filename, cache_dir=DEFAULT_CACHE_DIR):
+    """Location of the cache file for a source path."""
+    key = hashlib.blake2b(os.path.abspath(filename).encode(), digest_size=16).hexdigest()
+    return os.path.join(cache_dir, key + '.pmlog')
+
+
+def write_log(log, path, size, mtime_ns, digest):
+    """Writes an EventLog to the binary cache format."""
+    names = json.dumps({
+        'case_ids': log.case_ids,
+        'activities': log.activities,
+        'resources': log.resources,
+    }).encode()
+    # Write next to the target and rename, so readers never see half a file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, size, mtime_ns, len(log), log.num_events, len(names), log.ordered,
+                            digest))
+        for column, typecode in ((log.timestamp, 'q'), (log.offsets, 'q'),
+                                 (log.activity, 'i'), (log.resource, 'i')):
+            f.write(column if isinstance(column, array) else array(typecode, column))
+        f.write(names)
+    os.replace(tmp_path, path)
+
+
+def read_header(path):
+    """Returns the header fields of a cache file, or None if it is not one."""
+    with open(path, 'rb') as f:
+        data = f.read(HEADER.size)
+    if len(data) != HEADER.size:
+        return None
+    header = HEADER.unpack(data)
+    if header[0] != MAGIC:
+        return None
+    return header
+
+
+def read_log(path):
+    """Memory-maps a cache file back into a read-only EventLog.
+
+    The columns are memoryviews over the mapping, so nothing is copied until
+    the data is actually touched.
+    """
+    _, _, _, n_cases, n_events, names_length, ordered, _ = read_header(path)
+    with open(path, 'rb') as f:
+        view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    log = EventLog()
+    pos = HEADER.size
+    for name, typecode, length in (('timestamp', 'q', n_events), ('offsets', 'q', n_cases + 1),
+                                   ('activity', 'i', n_events), ('resource', 'i', n_events)):
+        end = pos + length * array(typecode).itemsize
+        setattr(log, name, view[pos:end].cast(typecode))
+        pos = end
+    names = json.loads(bytes(view[pos:pos + names_length]))
+    log.case_ids = names['case_ids']
+    log.activities = names['activities']
+    log.resources = names['resources']
+    log.activity_codes = {name: code for code, name in enumerate(log.activities)}
+    log.resource_codes = {name: code for code, name in enumerate(log.resources)}
+    log.ordered = bool(ordered)
+    return log
+
+
+def is_valid(header, path, filename, stat):
+    """Checks whether a cache header still describes the source file."""
+    _, size, mtime_ns, n_cases, n_events, names_length, ordered, digest = header
+    if size != stat.st_size:
+        return False
+    if mtime_ns == stat.st_mtime_ns:
+        return True
+    # The file was touched, only its content decides
+    if digest != file_digest(filename):
+        return False
+    # Same content: store the new mtime so the next load skips the hashing
+    with open(path, 'r+b') as f:
+        f.write(HEADER.pack(MAGIC, size, stat.st_mtime_ns, n_cases, n_events, names_length, ordered,
+                            digest))
+    return True
+
+
+def evict(cache_dir, max_bytes):
+    """Removes the least recently used files until the directory fits in max_bytes."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    # Oldest first; a cache hit refreshes the mtime of its file
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
+
+
+def load_log(filename, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, workers=1):
+    """Returns the EventLog of an XES file, parsing it only if the cache is stale.
+
+    With workers other than 1 a stale file is parsed in a process pool.
+    """
+    stat = os.stat(filename)
+    path = cache_path(filename, cache_dir)
+    if os.path.exists(path):
+        header = read_header(path)
+        if header is not None and is_valid(header, path, filename, stat):
+            os.utime(path)  # Mark as recently used for eviction
+            return read_log(path)
+
+    if workers == 1:
+        log = read_event_log(filename)
+    else:
+        log = read_event_log_parallel(filename, workers)
+    os.makedirs(cache_dir, exist_ok=True)
+    write_log(log, path, stat.st_size, stat.st_mtime_ns, file_digest(filename))
+    evict(cache_dir, max_bytes)
+    return log
@@ -0,0 +1,81 @@
+import random
+from datetime import datetime, timedelta
+from xml.sax.saxutils import quoteattr
+
+XES_HEADER = '''<?xml version="1.0" encoding="UTF-8" ?>
+<log xes.version="1.0" xes.features="nested-attributes" xmlns="http://www.xes-standard.org/">
+	<extension name="Organizational" prefix="org" uri="http://www.xes-standard.org/org.xesext"/>
+	<extension name="Time" prefix="time" uri="http://www.xes-standard.org/time.xesext"/>
+	<extension name="Concept" prefix="concept" uri="http://www.xes-standard.org/concept.xesext"/>
+	<string key="concept:name" value="synthetic-process"/>
+'''
+
+
+def build_model(activities, concurrency, rng):
+    """Splits activities into a sequence of blocks.
+
+    Each block is a list of activities; a block of more than one activity is
+    a parallel block whose activities may occur in any order. concurrency is
+    the probability that a block is parallel. The first and the last activity
+    are always on their own, like a start and an end event.
+    """
+    names = [f'activity {i}' for i in range(activities)]
+    blocks = []
+    i = 0
+    while i < len(names):
+        size = 1
+        if 0 < i < len(names) - 2 and rng.random() < concurrency:
+            size = min(rng.randint(2, 3), len(names) - 1 - i)
+        blocks.append(names[i:i + size])
+        i += size
+    return blocks
+
+
+def generate_trace(blocks, noise, rng):
+    """Plays the model once; with probability noise the trace is disturbed."""
+    trace = []
+    for block in blocks:
+        block = list(block)
+        rng.shuffle(block)
+        trace.extend(block)
+    if len(trace) > 1 and rng.random() < noise:
+        i = rng.randrange(len(trace) - 1)
+        kind = rng.randrange(3)
+        if kind == 0:
+            trace[i], trace[i + 1] = trace[i + 1], trace[i]  # Swapped events
+        elif kind == 1:
+            del trace[i]  # Missing event
+        else:
+            trace.insert(i, trace[i])  # Repeated event
+    return trace
+
+
+def generate_log(filename, cases, activities, concurrency=0.0, noise=0.0, seed=0, resources=10):
+    """Writes a seeded synthetic XES log and returns the number of events.
+
+    The same arguments always produce the same file. Traces follow one
+    sequence of blocks (see build_model), noise disturbs a fraction of them,
+    and events are one hour apart starting at the epoch, like the bundled
+    extension logs.
+    """
+    rng = random.Random(seed)
+    blocks = build_model(activities, concurrency, rng)
+    start = datetime(1970, 1, 1)
+    events = 0
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(XES_HEADER)
+        for case in range(cases):
+            f.write('\t<trace>\n')
+            f.write(f'\t\t<string key="concept:name" value="case_{case}"/>\n')
+            for i, activity in enumerate(generate_trace(blocks, noise, rng)):
+                timestamp = (start + timedelta(hours=i + 1)).isoformat() + '+00:00'
+                f.write('\t\t<event>\n')
+                f.write(f'\t\t\t<string key="org:resource" value="resource-{rng.randrange(resources)}"/>\n')
+                f.write(f'\t\t\t<int key="cost" value="{rng.randint(1, 500)}"/>\n')
+                f.write(f'\t\t\t<string key="concept:name" value={quoteattr(activity)}/>\n')
+                f.write(f'\t\t\t<date key="time:timestamp" value="{timestamp}"/>\n')
+                f.write('\t\t</event>\n')
+                events += 1
+            f.write('\t</trace>\n')
+        f.write('</log>\n')
+    return events
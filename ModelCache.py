@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import struct
+import sys
+import xml.etree.ElementTree as ET
+from array import array
+
+from EventLog import as_event_log
+from LogCache import evict
+from PetriNet import PetriNet
+
+DEFAULT_CACHE_DIR = '.modelcache'
+DEFAULT_MAX_BYTES = 64 << 20  # Total size the cache directory may grow to
+
+PNML_NAMESPACE = 'http://www.pnml.org/version-2009/grammar/pnml'
+PNML_NET_TYPE = 'http://www.pnml.org/version-2009/grammar/ptnet'
+
+# Binary model files start with this header, followed by the arcs as pairs
+# of int32 node numbers (place i is i, transition j is -j - 1), the initial
+# marking as int64 token counts by place and a JSON table with the place
+# names and the (name, id) pairs of the transitions. Numbers are written in
+# native byte order, which is recorded in the magic.
+MAGIC = b'PMNET1' + sys.byteorder[0].encode() + b'\0'
+# magic, places, transitions, arcs, names length
+HEADER = struct.Struct('<8sqqqq')
+
+
+def write_pnml(net, filename):
+    """Writes a net as a PNML place/transition net.
+
+    Places and transitions get the PNML ids p<i> and t<i>, with their names
+    as name text. Reading the file back gives string names.
+    """
+    # Children are written unprefixed and so fall in the default namespace
+    pnml = ET.Element('pnml', xmlns=PNML_NAMESPACE)
+    net_element = ET.SubElement(pnml, 'net', id='net', type=PNML_NET_TYPE)
+    page = ET.SubElement(net_element, 'page', id='page')
+    node_ids = {}
+    for i, place in enumerate(net.p):
+        node_ids[('p', place)] = f'p{i}'
+        element = ET.SubElement(page, 'place', id=f'p{i}')
+        ET.SubElement(ET.SubElement(element, 'name'), 'text').text = str(place)
+        tokens = net.initial_marking.get(place, 0)
+        if tokens:
+            ET.SubElement(ET.SubElement(element, 'initialMarking'), 'text').text = str(tokens)
+    for i, (name, id) in enumerate(net.t.items()):
+        node_ids[('t', id)] = f't{i}'
+        element = ET.SubElement(page, 'transition', id=f't{i}')
+        ET.SubElement(ET.SubElement(element, 'name'), 'text').text = str(name)
+    for i, (source, target) in enumerate(net.f):
+        # Arcs run from a place to a transition or the other way round
+        if ('p', source) in node_ids and ('t', target) in node_ids:
+            source_id, target_id = node_ids[('p', source)], node_ids[('t', target)]
+        else:
+            source_id, target_id = node_ids[('t', source)], node_ids[('p', target)]
+        ET.SubElement(page, 'arc', id=f'a{i}', source=source_id, target=target_id)
+    ET.indent(pnml)
+    ET.ElementTree(pnml).write(filename, encoding='utf-8', xml_declaration=True)
+
+
+def read_pnml(filename):
+    """Reads a PNML place/transition net into a PetriNet.
+
+    Nodes are named by their name text, or by their PNML id if they have
+    none; a transition's id in the PetriNet is its name. Pages are
+    flattened and namespaces ignored.
+    """
+    root = ET.parse(filename).getroot()
+
+    def local(element):
+        return element.tag.rsplit('}', 1)[-1]
+
+    def text_of(element, child):
+        for sub in element:
+            if local(sub) == child:
+                for text in sub:
+                    if local(text) == 'text':
+                        return (text.text or '').strip()
+        return None
+
+    net = PetriNet()
+    names = {}
+    places = []
+    transitions = []
+    marking = []
+    arcs = []
+    for element in root.iter():
+        kind = local(element)
+        if kind == 'place':
+            name = text_of(element, 'name') or element.get('id')
+            names[element.get('id')] = name
+            places.append(name)
+            tokens = text_of(element, 'initialMarking')
+            if tokens:
+                marking.append((name, int(tokens)))
+        elif kind == 'transition':
+            name = text_of(element, 'name') or element.get('id')
+            names[element.get('id')] = name
+            transitions.append((name, name))
+        elif kind == 'arc':
+            arcs.append((element.get('source'), element.get('target')))
+    net.add_places(places)
+    net.add_transitions(transitions)
+    invalid = net.add_arcs((names.get(source), names.get(target)) for source, target in arcs)
+    if invalid:
+        raise ValueError(f'{filename}: arcs between unknown nodes: {invalid}')
+    for place, tokens in marking:
+        net.set_initial_marking(place, tokens)
+    return net
+
+
+def write_model(net, path):
+    """Writes a net to the compact binary model format."""
+    place_index = {place: i for i, place in enumerate(net.p)}
+    transition_index = {id: i for i, id in enumerate(net.t.values())}
+    arcs = array('i')
+    for source, target in net.f:
+        if source in place_index and target in transition_index:
+            arcs.extend((place_index[source], -transition_index[target] - 1))
+        else:
+            arcs.extend((-transition_index[source] - 1, place_index[target]))
+    marking = array('q', (net.initial_marking.get(place, 0) for place in net.p))
+    names = json.dumps({'places': net.p, 'transitions': list(net.t.items())}).encode()
+    # Write next to the target and rename, so readers never see half a file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(net.p), len(net.t), len(net.f), len(names)))
+        f.write(arcs)
+        f.write(marking)
+        f.write(names)
+    os.replace(tmp_path, path)
+
+
+def read_model(path):
+    """Reads a net from the binary model format, or returns None if the file is not one."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        return None
+    magic, n_places, n_transitions, n_arcs, names_length = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        return None
+    pos = HEADER.size
+    arcs = array('i')
+    arcs.frombytes(data[pos:pos + 2 * n_arcs * arcs.itemsize])
+    pos += 2 * n_arcs * arcs.itemsize
+    marking = array('q')
+    marking.frombytes(data[pos:pos + n_places * marking.itemsize])
+    pos += n_places * marking.itemsize
+    names = json.loads(data[pos:pos + names_length])
+    # JSON has no tuples, but transition ids and place names may have been
+    places = [tuple(place) if isinstance(place, list) else place for place in names['places']]
+    transitions = [(name, tuple(id) if isinstance(id, list) else id) for name, id in names['transitions']]
+    ids = [id for _, id in transitions]
+
+    net = PetriNet()
+    net.add_places(places)
+    net.add_transitions(transitions)
+    net.add_arcs((places[source] if source >= 0 else ids[-source - 1],
+                  places[target] if target >= 0 else ids[-target - 1])
+                 for source, target in zip(arcs[::2], arcs[1::2]))
+    for place, tokens in zip(places, marking):
+        if tokens:
+            net.set_initial_marking(place, tokens)
+    return net
+
+
+def log_fingerprint(log):
+    """Digest of a log's variants and their frequencies.
+
+    Variants are taken by activity name and sorted, so logs with the same
+    behaviour share a fingerprint whatever their case order or encoding.
+    """
+    log = as_event_log(log)
+    names = log.activities
+    variants = sorted(([names[code] for code in trace], len(cases)) for trace, cases in log.variants().items())
+    return hashlib.blake2b(json.dumps(variants).encode(), digest_size=32).hexdigest()
+
+
+def model_path(fingerprint, miner, params=None, cache_dir=DEFAULT_CACHE_DIR):
+    """Location of the cached model mined by miner with params from a log with fingerprint."""
+    key = json.dumps([fingerprint, f'{miner.__module__}.{miner.__qualname__}', params or {}], sort_keys=True)
+    return os.path.join(cache_dir, hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + '.pmnet')
+
+
+def load_model(log, miner, params=None, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """Returns miner(log, **params), reusing a net mined earlier from a log with the same variants."""
+    log = as_event_log(log)
+    path = model_path(log_fingerprint(log), miner, params, cache_dir)
+    if os.path.exists(path):
+        net = read_model(path)
+        if net is not None:
+            os.utime(path)  # Mark as recently used for eviction
+            return net
+
+    net = miner(log, **(params or {}))
+    os.makedirs(cache_dir, exist_ok=True)
+    write_model(net, path)
+    evict(cache_dir, max_bytes)
+    return net
@@ -1,53 +1,249 @@
+import Instrumentation
+
+
 class PetriNet:
     def __init__(self):
         self.p = []  # Set of places
         self.t = {}  # Set of transitions (name to ID mapping)
         self.f = []  # Set of directed arcs (edges)
-        self.m = []  # Current marking (tokens in places)
+        self.m = {}  # Current marking (tokens in places), mapping place to count
+        self.initial_marking = {}  # Store initial marking to reset later
+        self.compiled = None  # CompiledNet of the current structure, see compile()
+        # Hash sets mirroring p and the IDs in t, for constant-time lookups
+        self.place_set = set()
+        self.transition_ids = set()
 
     def add_place(self, name):
-        if name not in self.p:
+        if name not in self.place_set:
             self.p.append(name)
+            self.place_set.add(name)
+            self.compiled = None
 
     def add_transition(self, name, id):
         if name not in self.t:
             self.t[name] = id
+            self.transition_ids.add(id)
+            self.compiled = None
+
+    def is_valid_arc(self, source, target):
+        return ((source in self.place_set and target in self.transition_ids)
+                or (source in self.transition_ids and target in self.place_set))
 
     def add_edge(self, source, target):
-        if (source in self.p and target in self.t.values()) or (source in self.t.values() and target in self.p):
+        if self.is_valid_arc(source, target):
             self.f.append((source, target))
+            self.compiled = None
         else:
             print(f"Invalid edge: source {source} or target {target} is not valid.")
         return self
 
+    def add_places(self, names):
+        """Adds several places at once, skipping the ones already present."""
+        for name in names:
+            if name not in self.place_set:
+                self.p.append(name)
+                self.place_set.add(name)
+        self.compiled = None
+        return self
+
+    def add_transitions(self, transitions):
+        """Adds several transitions at once from (name, id) pairs."""
+        for name, id in transitions:
+            if name not in self.t:
+                self.t[name] = id
+                self.transition_ids.add(id)
+        self.compiled = None
+        return self
+
+    def add_arcs(self, arcs):
+        """Adds the valid (source, target) arcs of a batch and returns the invalid ones.
+
+        Nothing is printed; the caller decides what to do with the report.
+        """
+        invalid = []
+        for source, target in arcs:
+            if self.is_valid_arc(source, target):
+                self.f.append((source, target))
+            else:
+                invalid.append((source, target))
+        self.compiled = None
+        return invalid
+
     def get_tokens(self, place):
-        return self.m.count(place)
+        return self.m.get(place, 0)
 
     def is_enabled(self, transition):
-        enabled = True
-        for edge in self.f:
-            if edge[1] == transition and self.get_tokens(edge[0]) == 0:
-                enabled = False
-        return enabled
+        # Checked inline: this runs once per event, too often for a call that does nothing
+        if Instrumentation.enabled:
+            Instrumentation.count('petri_net.enabledness_checks')
+        net = self.compile()
+        index = net.transition_index.get(transition)
+        if index is None:
+            return True
+        for place in net.preset[index]:
+            if self.get_tokens(net.places[place]) == 0:
+                return False
+        return True
+
+    def add_marking(self, place, tokens=1):
+        """Adds tokens to a place in the current marking."""
+        if place in self.place_set:
+            self.m[place] = self.m.get(place, 0) + tokens
 
-    def add_marking(self, place):
-        if place in self.p:
-            self.m.append(place)
+    def set_initial_marking(self, place, tokens=1):
+        """Sets the token count of a place in both the current and the initial marking."""
+        if place in self.place_set:
+            self.m[place] = tokens
+            self.initial_marking[place] = tokens
+            self.compiled = None
+
+    def store_initial_marking(self):
+        """Stores the current marking as the initial marking."""
+        self.initial_marking = self.m.copy()
+        self.compiled = None
+
+    def reset_marking(self):
+        """Reset the token marking to the initial marking."""
+        self.m = self.initial_marking.copy()
 
     def fire_transition(self, transition):
-        if not self.is_enabled(transition):
-            print(f"Transition {transition} is not enabled.")
-            return
-        for edge in self.f:
-            if edge[1] == transition:
-                self.m.remove(edge[0])
-        for edge in self.f:
-            if edge[0] == transition:
-                self.m.append(edge[1])
+        """Fires a transition if it is enabled and returns (consumed, produced, missing)."""
+        net = self.compile()
+        index = net.transition_index.get(transition)
+        if index is None:
+            return 0, 0, 0
+        places = net.places
+        missing = 0
+        for place in net.preset[index]:
+            if self.get_tokens(places[place]) < 1:
+                missing += 1
+        if missing:
+            if Instrumentation.enabled:
+                Instrumentation.count('petri_net.missing_tokens', missing)
+            return 0, 0, missing
+        if Instrumentation.enabled:
+            Instrumentation.count('petri_net.transitions_fired')
+        # Remove tokens from input places
+        for place in net.preset[index]:
+            self.m[places[place]] -= 1
+        # Add tokens to output places
+        for place in net.postset[index]:
+            self.m[places[place]] = self.m.get(places[place], 0) + 1
+        return len(net.preset[index]), len(net.postset[index]), 0
 
     def transition_name_to_id(self, name):
         return self.t.get(name)
 
+    def compile(self):
+        """Returns the CompiledNet of this net, rebuilding it after changes."""
+        if self.compiled is None:
+            self.compiled = CompiledNet(self)
+        return self.compiled
+
+
+class CompiledNet:
+    """Frozen form of a PetriNet for replay.
+
+    Places and transitions are numbered, and every transition keeps the
+    indices of its input places (preset) and output places (postset), so
+    firing touches only the places next to the transition instead of
+    scanning all arcs.
+
+    Markings are immutable and hashable. A 1-safe marking is an int with one
+    bit per place, so enabledness is a single mask test; any other marking
+    is a tuple of token counts by place index. Firing switches from the
+    bitmask to the tuple as soon as a place would get a second token, and
+    back once every place holds at most one again, so each marking has a
+    single form and equal markings compare and hash equal.
+    """
+
+    def __init__(self, net):
+        self.places = list(net.p)
+        self.place_index = {place: i for i, place in enumerate(self.places)}
+        # Arcs refer to transitions by ID, so that is what we index by
+        self.transitions = list(net.t.values())
+        self.transition_index = {transition: i for i, transition in enumerate(self.transitions)}
+        # Transition names, which is what log activities are matched against
+        self.labels = list(net.t)
+        self.label_index = {label: i for i, label in enumerate(self.labels)}
+        self.preset = [[] for _ in self.transitions]
+        self.postset = [[] for _ in self.transitions]
+        for source, target in net.f:
+            if target in self.transition_index:
+                self.preset[self.transition_index[target]].append(self.place_index[source])
+            else:
+                self.postset[self.transition_index[source]].append(self.place_index[target])
+        self.preset = [tuple(places) for places in self.preset]
+        self.postset = [tuple(places) for places in self.postset]
+        self.preset_mask = [sum(1 << place for place in set(places)) for places in self.preset]
+        self.postset_mask = [sum(1 << place for place in set(places)) for places in self.postset]
+        # Bitmasks can only stand for markings if no arc is doubled
+        self.bitmask_arcs = all(len(set(places)) == len(places) for places in self.preset + self.postset)
+        self.initial_marking = self.pack([net.initial_marking.get(place, 0) for place in self.places])
+
+    def pack(self, counts):
+        """Turns token counts by place index into a marking."""
+        if self.bitmask_arcs and all(count in (0, 1) for count in counts):
+            return sum(1 << place for place, count in enumerate(counts) if count)
+        return tuple(counts)
+
+    def unpack(self, marking):
+        """Token counts by place index of a marking, as a tuple."""
+        if isinstance(marking, int):
+            return tuple((marking >> place) & 1 for place in range(len(self.places)))
+        return marking
+
+    def tokens(self, marking, place):
+        if isinstance(marking, int):
+            return (marking >> place) & 1
+        return marking[place]
+
+    def total_tokens(self, marking):
+        if isinstance(marking, int):
+            return marking.bit_count()
+        return sum(marking)
+
+    def is_enabled(self, marking, transition):
+        if isinstance(marking, int):
+            preset = self.preset_mask[transition]
+            return marking & preset == preset
+        return all(marking[place] >= 1 for place in self.preset[transition])
+
+    def fire(self, marking, transition):
+        """Fires transition (an index) on marking, if it is enabled.
+
+        Returns (marking, consumed, produced, missing); a transition with
+        missing tokens does not fire and leaves the marking as it was.
+        """
+        if isinstance(marking, int):
+            preset = self.preset_mask[transition]
+            if marking & preset != preset:
+                return marking, 0, 0, (preset & ~marking).bit_count()
+            marking &= ~preset
+            postset = self.postset_mask[transition]
+            if not marking & postset:
+                return marking | postset, len(self.preset[transition]), len(self.postset[transition]), 0
+            # A place would hold two tokens: go on with counts
+            counts = list(self.unpack(marking))
+            for place in self.postset[transition]:
+                counts[place] += 1
+            return tuple(counts), len(self.preset[transition]), len(self.postset[transition]), 0
+
+        preset = self.preset[transition]
+        missing = 0
+        for place in preset:
+            if marking[place] < 1:
+                missing += 1
+        if missing:
+            return marking, 0, 0, missing
+        counts = list(marking)
+        for place in preset:
+            counts[place] -= 1
+        postset = self.postset[transition]
+        for place in postset:
+            counts[place] += 1
+        return self.pack(counts), len(preset), len(postset), 0
+
 
 if __name__ == "__main__":
     p = PetriNet()
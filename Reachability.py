@@ -0,0 +1,166 @@
+from collections import deque
+
+import Instrumentation
+
+DEFAULT_MAX_STATES = 1_000_000
+
+
+def canonical(net, marking):
+    """The single form of a marking: the bitmask whenever it is 1-safe, else the counts."""
+    return marking if isinstance(marking, int) else net.pack(marking)
+
+
+def marking_key(net, marking):
+    """Compact hashable form of a marking for the visited set.
+
+    1-safe markings are ints with a bit per place; token counts below 256
+    are packed into bytes, one per place, instead of a tuple of ints. The
+    marking is made canonical first, so one marking always gets one key.
+    """
+    marking = canonical(net, marking)
+    if isinstance(marking, int) or max(marking, default=0) > 255:
+        return marking
+    return bytes(marking)
+
+
+def key_marking(key):
+    """Marking of a visited-set key, the inverse of marking_key."""
+    return tuple(key) if isinstance(key, bytes) else key
+
+
+def covers(net, larger, smaller):
+    """Places where larger has more tokens than smaller, or None unless larger covers smaller."""
+    larger = net.unpack(larger)
+    smaller = net.unpack(smaller)
+    if any(a < b for a, b in zip(larger, smaller)):
+        return None
+    return [place for place, (a, b) in enumerate(zip(larger, smaller)) if a > b]
+
+
+def explore(pn, order='bfs', max_states=DEFAULT_MAX_STATES, final_place='o_W', max_reported=10):
+    """Explores the reachability graph of a PetriNet from its initial marking.
+
+    order is 'bfs' or 'dfs'. At most max_states markings are visited, which
+    bounds memory: the visited set maps each packed marking to its parent.
+    A new marking that strictly covers one of its ancestors shows that the
+    places where it is larger are unbounded; it is not explored further.
+    While markings stay 1-safe bitmasks no place can grow, so the ancestor
+    check only runs on multi-token markings.
+
+    Returns a report dict: states and edges visited, whether the graph was
+    complete, deadlocks (dead markings other than the final marking, one
+    token in final_place), unbounded places, dead transitions (never
+    enabled; conclusive only if complete), whether the final marking is
+    reachable, improper completions (final_place marked with tokens left
+    elsewhere), the markings from which the final marking cannot be reached
+    any more, found by a backward pass over the explored edges, and the
+    resulting soundness verdict. Keeping the edges for that pass costs one
+    key per edge on top of the visited set.
+    """
+    net = pn.compile()
+    final = net.pack([1 if place == final_place else 0 for place in net.places])
+    final_index = net.place_index.get(final_place)
+    transitions = range(len(net.transitions))
+    masks = list(zip(transitions, net.preset_mask, net.postset_mask))
+
+    start = canonical(net, net.initial_marking)
+    visited = {marking_key(net, start): None}
+    frontier = deque([start])
+    take = frontier.popleft if order == 'bfs' else frontier.pop
+    fired = [False] * len(net.transitions)
+    predecessors = {}  # Key to the keys of the markings with an edge to it
+    edges = 0
+    deadlocks = 0
+    deadlock_examples = []
+    improper = 0
+    unbounded = set()
+    truncated = False
+    final_reachable = False
+
+    def as_dict(marking):
+        return {net.places[place]: count for place, count in enumerate(net.unpack(marking)) if count}
+
+    with Instrumentation.stage('reachability'):
+        while frontier:
+            marking = take()
+            if marking == final:
+                final_reachable = True
+            elif final_index is not None and net.tokens(marking, final_index):
+                improper += 1
+            enabled = False
+            safe = isinstance(marking, int)
+            for transition, preset, postset in masks:
+                if safe:
+                    # Bitmask markings fire inline while no place gets a second token
+                    if marking & preset != preset:
+                        continue
+                    child = marking & ~preset
+                    child = child | postset if not child & postset else net.fire(marking, transition)[0]
+                elif net.is_enabled(marking, transition):
+                    child = net.fire(marking, transition)[0]
+                else:
+                    continue
+                # Compared with final and stored as a key below: one form per marking
+                child = canonical(net, child)
+                enabled = True
+                fired[transition] = True
+                edges += 1
+                key = marking_key(net, child)
+                parent_key = marking_key(net, marking)
+                if key in visited:
+                    predecessors.setdefault(key, []).append(parent_key)
+                    continue
+                if not isinstance(child, int):
+                    # Coverability against the ancestors of the child
+                    ancestor = parent_key
+                    growing = None
+                    while ancestor is not None and not growing:
+                        growing = covers(net, child, key_marking(ancestor))
+                        ancestor = visited[ancestor]
+                    if growing:
+                        unbounded.update(net.places[place] for place in growing)
+                        truncated = True
+                        continue
+                if len(visited) >= max_states:
+                    truncated = True
+                    continue
+                visited[key] = parent_key
+                predecessors.setdefault(key, []).append(parent_key)
+                frontier.append(child)
+            if not enabled and marking != final:
+                deadlocks += 1
+                if len(deadlock_examples) < max_reported:
+                    deadlock_examples.append(as_dict(marking))
+
+        # Backward pass from the final marking over the explored edges: every
+        # marking it does not reach can no longer complete
+        final_key = marking_key(net, final)
+        completing = {final_key} if final_key in visited else set()
+        pending = list(completing)
+        while pending:
+            for parent in predecessors.get(pending.pop(), ()):
+                if parent not in completing:
+                    completing.add(parent)
+                    pending.append(parent)
+        stuck = [key for key in visited if key not in completing]
+    Instrumentation.count('reachability.states', len(visited))
+    Instrumentation.count('reachability.edges', edges)
+
+    complete = not truncated
+    dead_transitions = [net.labels[t] for t in transitions if not fired[t]]
+    return {
+        'states': len(visited),
+        'edges': edges,
+        'complete': complete,
+        'bounded': not unbounded if complete or unbounded else None,
+        'unbounded_places': sorted(unbounded, key=str),
+        'deadlocks': deadlocks,
+        'deadlock_markings': deadlock_examples,
+        'dead_transitions': dead_transitions,
+        'final_reachable': final_reachable,
+        'improper_completions': improper,
+        'cannot_complete': len(stuck),
+        'cannot_complete_markings': [as_dict(key_marking(key)) for key in stuck[:max_reported]],
+        'sound': (complete and final_reachable and not stuck and not deadlocks and not improper
+                  and not dead_transitions),
+    }
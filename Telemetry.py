@@ -0,0 +1,204 @@
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from EventLog import EventLog
+
+# Column names of the OpenF1 car data in driver.csv and of FastF1 telemetry
+# as used in f1.ipynb, by role
+OPENF1_COLUMNS = {'time': 'date', 'speed': 'speed', 'gear': 'n_gear', 'brake': 'brake', 'drs': 'drs',
+                  'case': 'driver_number'}
+FASTF1_COLUMNS = {'time': 'Date', 'speed': 'Speed', 'gear': 'nGear', 'brake': 'Brake', 'drs': 'DRS',
+                  'case': 'CaseID'}
+# driver.csv columns once assign_laps has added CaseID, one case per driver and lap
+SEGMENTED_COLUMNS = {**OPENF1_COLUMNS, 'case': 'CaseID'}
+
+# Lap table columns used to segment raw car data into laps, as in
+# fastest_driver_1.csv
+LAP_TABLE_COLUMNS = {'driver': 'DriverNumber', 'lap': 'LapNumber', 'start': 'LapStartDate', 'time': 'LapTime'}
+
+# DRS values that mean the flap is open
+DRS_OPEN = (10, 12, 14)
+
+# Activities of the converted log; the position is the activity code, and
+# events on the same sample are ordered by it
+ACTIVITIES = ['BrakeApplied', 'BrakeReleased', 'GearUp', 'GearDown', 'DRSOpened', 'DRSClosed',
+              'TopSpeedAchieved']
+
+
+def to_array(typecode, values):
+    """Copies a numpy array into an array.array without a Python-level loop."""
+    column = array(typecode)
+    column.frombytes(np.ascontiguousarray(values, dtype=np.int32 if typecode == 'i' else np.int64).tobytes())
+    return column
+
+
+def timestamps_us(values):
+    """Parses a time column to int64 microseconds since the epoch, as naive UTC."""
+    times = pd.to_datetime(values, utc=True, format='ISO8601')
+    return times.dt.tz_convert(None).to_numpy(dtype='datetime64[us]').astype(np.int64)
+
+
+def detect_events(case, speed, gear, brake, drs):
+    """Finds the telemetry events in samples already sorted by case and time.
+
+    All inputs are numpy arrays of equal length. Returns (rows, codes): the
+    sample position and activity code of every event, in sample order.
+    """
+    n = len(case)
+    # A sample continues its case if the previous sample belongs to the same one
+    same_case = np.zeros(n, dtype=bool)
+    same_case[1:] = case[1:] == case[:-1]
+
+    braking = brake > 0
+    was_braking = np.roll(braking, 1)
+    drs_open = np.isin(drs, DRS_OPEN)
+    was_open = np.roll(drs_open, 1)
+    previous_gear = np.roll(gear, 1)
+
+    detectors = [
+        same_case & braking & ~was_braking,  # BrakeApplied
+        same_case & ~braking & was_braking,  # BrakeReleased
+        same_case & (gear > previous_gear),  # GearUp
+        same_case & (gear < previous_gear),  # GearDown
+        same_case & drs_open & ~was_open,  # DRSOpened
+        same_case & ~drs_open & was_open,  # DRSClosed
+    ]
+
+    # TopSpeedAchieved: the first sample at the maximum speed of each case,
+    # as groupby().idxmax() picks it in the notebook
+    starts = np.flatnonzero(~same_case)
+    lengths = np.diff(np.append(starts, n))
+    at_max = speed == np.repeat(np.maximum.reduceat(speed, starts), lengths)
+    candidates = np.flatnonzero(at_max)
+    first = np.ones(len(candidates), dtype=bool)
+    first[1:] = case[candidates[1:]] != case[candidates[:-1]]
+    top_speed = np.zeros(n, dtype=bool)
+    top_speed[candidates[first]] = True
+    detectors.append(top_speed)
+
+    rows = np.concatenate([np.flatnonzero(mask) for mask in detectors])
+    codes = np.concatenate([np.full(int(mask.sum()), code, dtype=np.int32)
+                            for code, mask in enumerate(detectors)])
+    # Sample order first, activity code for events on the same sample
+    order = np.lexsort((codes, rows))
+    return rows[order], codes[order]
+
+
+def lap_numbers(sample_driver, sample_time, lap_table, lap_columns=LAP_TABLE_COLUMNS):
+    """Assigns every sample the number of the lap it falls in, with one sorted search.
+
+    sample_driver and sample_time (int64 microseconds) are numpy arrays. A
+    lap runs from its start date for its lap time, or up to the next lap of
+    the driver when the lap time is missing. Drivers are laid out one after
+    another on a single time axis, so the whole grid is joined at once.
+    Samples outside every lap get 0. Laps without a start date, which NaT
+    would turn into the smallest int64 and so stretch the time axis, are
+    left out.
+    """
+    lap_start = timestamps_us(lap_table[lap_columns['start']])
+    started = lap_start != np.iinfo(np.int64).min  # NaT
+    if not started.any() or len(sample_time) == 0:
+        return np.zeros(len(sample_time), dtype=np.int64)
+    lap_start = lap_start[started]
+    lap_driver = lap_table[lap_columns['driver']].to_numpy()[started]
+    lap_time = pd.to_timedelta(lap_table[lap_columns['time']]).to_numpy(dtype='timedelta64[us]')[started]
+    lap_number = lap_table[lap_columns['lap']].to_numpy()[started]
+
+    # Shared driver codes for both tables
+    driver_codes, _ = pd.factorize(np.concatenate([lap_driver.astype(str), sample_driver.astype(str)]))
+    lap_code = driver_codes[:len(lap_driver)]
+    sample_code = driver_codes[len(lap_driver):]
+    origin = min(lap_start.min(), sample_time.min())
+    span = max(lap_start.max(), sample_time.max()) - origin + 1
+    lap_key = lap_code * span + (lap_start - origin)
+    sample_key = sample_code * span + (sample_time - origin)
+
+    order = np.argsort(lap_key, kind='stable')
+    lap_key = lap_key[order]
+    lap_code = lap_code[order]
+    lap_start = lap_start[order]
+    lap_time = lap_time[order]
+    lap_number = lap_number[order]
+    # Laps without a lap time end where the driver's next lap starts
+    next_start = np.r_[lap_start[1:], np.iinfo(np.int64).max]
+    next_start[:-1][lap_code[1:] != lap_code[:-1]] = np.iinfo(np.int64).max
+    lap_end = np.where(np.isnat(lap_time), next_start, lap_start + lap_time.astype(np.int64))
+
+    lap = np.searchsorted(lap_key, sample_key, side='right') - 1
+    found = lap >= 0
+    lap = np.maximum(lap, 0)
+    inside = found & (lap_code[lap] == sample_code) & (sample_time < lap_end[lap])
+    return np.where(inside, np.nan_to_num(lap_number[lap]).astype(np.int64), 0)
+
+
+def assign_laps(telemetry, lap_table, columns=OPENF1_COLUMNS, lap_columns=LAP_TABLE_COLUMNS):
+    """Adds LapNumber and CaseID columns to raw car data such as driver.csv.
+
+    CaseID is '<driver>-<lap>', so laps of different drivers are different
+    cases. Samples outside every lap get lap 0. The result can go straight
+    into telemetry_to_event_log with SEGMENTED_COLUMNS, or into
+    TelemetryStore.write_telemetry with lap_column='LapNumber'.
+    """
+    telemetry = telemetry.copy()
+    driver = telemetry[columns['case']].to_numpy()
+    telemetry['LapNumber'] = lap_numbers(driver, timestamps_us(telemetry[columns['time']]), lap_table, lap_columns)
+    telemetry['CaseID'] = (telemetry[columns['case']].astype(str) + '-'
+                           + telemetry['LapNumber'].astype(str).str.zfill(2))
+    return telemetry
+
+
+def telemetry_to_event_log(telemetry, columns=OPENF1_COLUMNS):
+    """Converts a telemetry table into an EventLog in one vectorized pass.
+
+    Every value of the case column (a lap number or a driver_number) becomes
+    a case, and brake applied/released, gear changes, DRS opening/closing
+    and the top speed become its events. columns maps the roles time, speed,
+    gear, brake, drs and case to column names; OPENF1_COLUMNS fits driver.csv
+    and FASTF1_COLUMNS the lap telemetry of the notebook. Samples without a
+    case value are left out.
+    """
+    # factorize would code missing cases as -1, sorting them into a case of their own
+    telemetry = telemetry[telemetry[columns['case']].notna()]
+    if len(telemetry) == 0:
+        return EventLog()
+    time = timestamps_us(telemetry[columns['time']])
+    case_codes, case_ids = pd.factorize(telemetry[columns['case']], sort=True)
+
+    # Samples grouped by case and in time order within each case
+    order = np.lexsort((time, case_codes))
+    case = case_codes[order]
+    time = time[order]
+    rows, codes = detect_events(
+        case,
+        telemetry[columns['speed']].to_numpy()[order],
+        telemetry[columns['gear']].to_numpy()[order],
+        telemetry[columns['brake']].to_numpy().astype(np.int64)[order],
+        telemetry[columns['drs']].to_numpy()[order],
+    )
+
+    offsets = np.searchsorted(case[rows], np.arange(len(case_ids) + 1))
+    return EventLog.from_columns(
+        [str(case_id) for case_id in case_ids],
+        ACTIVITIES,
+        to_array('i', codes),
+        to_array('q', time[rows]),
+        to_array('q', offsets),
+        ordered=True,
+    )
+
+
+def lap_event_log(telemetry, lap_table, columns=OPENF1_COLUMNS, lap_columns=LAP_TABLE_COLUMNS):
+    """Segments raw car data of any number of drivers into laps and converts it to an EventLog.
+
+    Samples outside every lap are left out.
+    """
+    telemetry = assign_laps(telemetry, lap_table, columns, lap_columns)
+    return telemetry_to_event_log(telemetry[telemetry['LapNumber'] > 0], {**columns, 'case': 'CaseID'})
+
+
+def read_telemetry_log(filename, columns=OPENF1_COLUMNS):
+    """Reads a telemetry CSV such as driver.csv into an EventLog."""
+    usecols = [columns[role] for role in ('time', 'speed', 'gear', 'brake', 'drs', 'case')]
+    return telemetry_to_event_log(pd.read_csv(filename, usecols=usecols), columns)
@@ -0,0 +1,198 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_STORE_DIR = '.telemetry'
+
+# Telemetry is partitioned as <store>/session=<key>/driver=<number>/lap=<n>/
+# with one .npy file per column and columns.json holding the column order.
+# The lap table of a session lives in <store>/session=<key>/laps/ in the same
+# layout. Filters on session, driver and lap pick directories, and only the
+# requested column files are opened, memory-mapped.
+COLUMNS_FILE = 'columns.json'
+DRIVER_COLUMN = 'DriverNumber'
+LAP_COLUMN = 'CaseID'  # As in the notebook's lap dataset
+
+
+def partition_value(text):
+    """Directory value back to its key: an int where possible, else the string."""
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+
+def column_array(series):
+    """A column as a numpy array np.save can write without pickling.
+
+    Timezone-aware times are stored as naive UTC, and object and string
+    columns, such as Compound, as strings with missing values empty.
+    """
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        return series.dt.tz_convert(None).to_numpy()
+    if pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype):
+        return series.fillna('').astype(str).to_numpy(dtype=str)
+    return series.to_numpy()
+
+
+def write_partition(path, frame):
+    """Writes a frame as a column directory, replacing any earlier version."""
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name in frame.columns:
+        np.save(os.path.join(tmp_path, f'{name}.npy'), column_array(frame[name]), allow_pickle=False)
+    with open(os.path.join(tmp_path, COLUMNS_FILE), 'w') as f:
+        json.dump([str(name) for name in frame.columns], f)
+    # A directory cannot be renamed over another one, so the old partition is
+    # moved aside first: readers may find no partition between the two
+    # renames, but never half of one
+    old_path = path + '.old'
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def read_partition(path, columns=None):
+    """Loads the requested columns of a partition as memory-mapped arrays."""
+    with open(os.path.join(path, COLUMNS_FILE)) as f:
+        stored = json.load(f)
+    if columns is None:
+        columns = stored
+    missing = [name for name in columns if name not in stored]
+    if missing:
+        raise KeyError(f'columns not in store: {missing}')
+    return {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in columns}
+
+
+def session_path(store, session):
+    return os.path.join(store, f'session={session}')
+
+
+def lap_path(store, session, driver, lap):
+    return os.path.join(session_path(store, session), f'driver={driver}', f'lap={int(lap)}')
+
+
+def list_partitions(path, prefix):
+    """Keys of the partition directories directly under path."""
+    if not os.path.isdir(path):
+        return []
+    keys = [partition_value(name[len(prefix):]) for name in os.listdir(path)
+            if name.startswith(prefix) and not name.endswith(('.tmp', '.old'))]
+    return sorted(keys, key=lambda key: (isinstance(key, str), key))
+
+
+def sessions(store=DEFAULT_STORE_DIR):
+    return list_partitions(store, 'session=')
+
+
+def drivers(store, session):
+    return list_partitions(session_path(store, session), 'driver=')
+
+
+def laps(store, session, driver):
+    return list_partitions(os.path.join(session_path(store, session), f'driver={driver}'), 'lap=')
+
+
+def write_lap(store, session, driver, lap, telemetry, key_columns=(DRIVER_COLUMN, LAP_COLUMN)):
+    """Stores the telemetry of one lap; appending a lap touches only its own partition.
+
+    key_columns, the columns holding the driver and lap keys, are not stored
+    as they are given back by the partition directories.
+    """
+    telemetry = telemetry.drop(columns=list(key_columns), errors='ignore')
+    path = lap_path(store, session, driver, lap)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_partition(path, telemetry)
+
+
+def write_telemetry(store, session, telemetry, driver_column='driver_number', lap_column=LAP_COLUMN):
+    """Stores a telemetry table covering any number of drivers and laps.
+
+    The table is split into (driver, lap) partitions with a single sort
+    rather than a filter per lap. Samples without a lap column, like the
+    raw car data in driver.csv, are stored as lap 0. Returns the number of
+    partitions written.
+    """
+    if driver_column not in telemetry:
+        raise KeyError(f'driver column {driver_column!r} not in telemetry')
+    driver = telemetry[driver_column].to_numpy()
+    lap = telemetry[lap_column].to_numpy() if lap_column in telemetry else np.zeros(len(telemetry), dtype=int)
+    # Stable, so samples keep their order within each partition
+    order = np.lexsort((lap, driver))
+    telemetry = telemetry.iloc[order]
+    driver = driver[order]
+    lap = lap[order]
+    starts = np.flatnonzero(np.r_[True, (driver[1:] != driver[:-1]) | (lap[1:] != lap[:-1])])
+    ends = np.r_[starts[1:], len(order)]
+    keys = (driver_column, lap_column)
+    for start, end in zip(starts, ends):
+        write_lap(store, session, driver[start], lap[start], telemetry.iloc[start:end], keys)
+    return len(starts)
+
+
+def write_laps(store, session, lap_table):
+    """Stores the lap table of a session, such as fastest_driver_1.csv."""
+    path = os.path.join(session_path(store, session), 'laps')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_partition(path, lap_table.reset_index(drop=True))
+
+
+def read_telemetry(store, session, driver=None, lap_numbers=None, columns=None):
+    """Loads telemetry of a session as one DataFrame.
+
+    driver and lap_numbers restrict the partitions that are opened (None for
+    all) and columns the column files that are read. The result carries
+    DriverNumber and CaseID columns with the partition keys, unless a
+    stored column of the same name, such as the CaseID of assign_laps, is
+    read.
+    """
+    driver_keys = drivers(store, session) if driver is None else [driver]
+    wanted = None if lap_numbers is None else {int(lap) for lap in lap_numbers}
+    parts = []
+    keys = []
+    for driver_key in driver_keys:
+        for lap in laps(store, session, driver_key):
+            if wanted is None or lap in wanted:
+                part = read_partition(lap_path(store, session, driver_key, lap), columns)
+                parts.append(part)
+                keys.append((driver_key, lap, len(next(iter(part.values()))) if part else 0))
+    if not parts:
+        return pd.DataFrame(columns=list(dict.fromkeys([DRIVER_COLUMN, LAP_COLUMN, *(columns or [])])))
+
+    # One concatenation per column instead of a growing DataFrame
+    lengths = [length for _, _, length in keys]
+    data = {
+        DRIVER_COLUMN: np.repeat([driver_key for driver_key, _, _ in keys], lengths),
+        LAP_COLUMN: np.repeat([lap for _, lap, _ in keys], lengths),
+    }
+    for name in parts[0]:
+        data[name] = np.concatenate([part[name] for part in parts])
+    return pd.DataFrame(data)
+
+
+def read_laps(store, session, driver=None, lap_numbers=None, columns=None,
+              driver_column=DRIVER_COLUMN, lap_column='LapNumber'):
+    """Loads the lap table of a session, optionally only some drivers' laps and columns."""
+    needed = None if columns is None else list(dict.fromkeys([*columns, driver_column, lap_column]))
+    table = pd.DataFrame(read_partition(os.path.join(session_path(store, session), 'laps'), needed))
+    keep = np.ones(len(table), dtype=bool)
+    if driver is not None:
+        keep &= table[driver_column].to_numpy() == driver
+    if lap_numbers is not None:
+        keep &= np.isin(table[lap_column].to_numpy(), list(lap_numbers))
+    table = table[keep].reset_index(drop=True)
+    return table if columns is None else table[list(columns)]
+
+
+def import_csv(store, session, filename, driver_column='driver_number', lap_column=LAP_COLUMN, columns=None):
+    """Parses a telemetry CSV once and stores it; later reads skip the CSV entirely."""
+    telemetry = pd.read_csv(filename, usecols=columns)
+    if 'date' in telemetry:
+        telemetry['date'] = pd.to_datetime(telemetry['date'], utc=True, format='ISO8601')
+    return write_telemetry(store, session, telemetry, driver_column, lap_column)
@@ -0,0 +1,138 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from EventLog import as_event_log
+import Instrumentation
+
+# Net and activity mapping of a replay worker, set once by init_worker
+_shared = {}
+
+
+def build_prefix_tree(weighted_traces):
+    """Builds the prefix tree of (trace, frequency) pairs.
+
+    Returns (children, counts, ends), lists indexed by node with node 0 the
+    empty prefix: children maps an activity code to the child node, counts
+    is the number of cases passing through a node and ends the number of
+    cases that end there.
+    """
+    children = [{}]
+    counts = [0]
+    ends = [0]
+    for trace, frequency in weighted_traces:
+        node = 0
+        counts[0] += frequency
+        for code in trace:
+            child = children[node].get(code)
+            if child is None:
+                child = children[node][code] = len(children)
+                children.append({})
+                counts.append(0)
+                ends.append(0)
+            counts[child] += frequency
+            node = child
+        ends[node] += frequency
+    return children, counts, ends
+
+
+def replay_prefix_tree(net, tree, transition_of, final):
+    """Token-replays a prefix tree on a CompiledNet and returns the case-weighted totals.
+
+    The tree is walked depth first, carrying the marking and the counters
+    down, so a prefix shared by several variants is replayed once.
+    transition_of maps activity codes to transition indices and final is the
+    index of the place whose tokens do not count as remaining, or None.
+    Returns (produced, consumed, missing, remaining).
+    """
+    children, counts, ends = tree
+    produced = 0
+    consumed = 0
+    missing = 0
+    remaining = 0
+    checks = 0
+    blocked = 0
+    # Markings are immutable, so children can share their parent's marking
+    stack = [(0, net.initial_marking)]
+    while stack:
+        node, marking = stack.pop()
+        if ends[node]:
+            left = net.total_tokens(marking)
+            if final is not None:
+                left -= net.tokens(marking, final)
+            remaining += left * ends[node]
+        for code, child in children[node].items():
+            child_marking = marking
+            transition = transition_of[code]
+            # Activities without a transition change nothing
+            if transition is not None:
+                child_marking, cons, prod, miss = net.fire(marking, transition)
+                checks += 1
+                if miss:
+                    blocked += 1
+                weight = counts[child]
+                consumed += cons * weight
+                produced += prod * weight
+                missing += miss * weight
+            stack.append((child, child_marking))
+    # Work actually done on the tree, not weighted by cases
+    Instrumentation.count('replay.enabledness_checks', checks)
+    Instrumentation.count('replay.transitions_fired', checks - blocked)
+    return produced, consumed, missing, remaining
+
+
+def init_worker(net, transition_of, final, instrumented):
+    _shared['net'] = net
+    _shared['transition_of'] = transition_of
+    _shared['final'] = final
+    if instrumented:
+        Instrumentation.enable()
+
+
+def replay_shard(weighted_traces):
+    """Replays one shard of variants with the net shipped to this worker.
+
+    Returns the totals and the counters this shard added, so the parent can
+    merge them into its own instrumentation.
+    """
+    Instrumentation.reset()
+    tree = build_prefix_tree(weighted_traces)
+    totals = replay_prefix_tree(_shared['net'], tree, _shared['transition_of'], _shared['final'])
+    return totals, dict(Instrumentation.counters)
+
+
+def replay_totals(net, log, final_place='o_W', workers=1):
+    """Token-replays a log on a CompiledNet and returns (produced, consumed, missing, remaining).
+
+    remaining counts the tokens left outside final_place when a case ends.
+    With workers > 1 the variants are sorted, cut into contiguous shards so
+    that shared prefixes mostly stay together, and replayed in a process
+    pool that receives the net once. The totals are integers, so the result
+    is the same as the serial replay. workers=None uses every CPU, as
+    read_event_log_parallel does.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f'workers must be at least 1, got {workers}')
+    log = as_event_log(log)
+    transition_of = [net.label_index.get(name) for name in log.activities]
+    final = net.place_index.get(final_place)
+    weighted_traces = [(trace, len(cases)) for trace, cases in log.variants().items()]
+    if workers == 1 or len(weighted_traces) < 2:
+        totals = replay_prefix_tree(net, build_prefix_tree(weighted_traces), transition_of, final)
+        Instrumentation.count('replay.missing_tokens', totals[2])
+        return totals
+
+    weighted_traces.sort()
+    size = -(-len(weighted_traces) // workers)
+    shards = [weighted_traces[i:i + size] for i in range(0, len(weighted_traces), size)]
+    totals = [0, 0, 0, 0]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(net, transition_of, final, Instrumentation.enabled)) as pool:
+        for result, counters in pool.map(replay_shard, shards):
+            for i, value in enumerate(result):
+                totals[i] += value
+            for name, value in counters.items():
+                Instrumentation.count(name, value)
+    Instrumentation.count('replay.missing_tokens', totals[2])
+    return tuple(totals)
@@ -0,0 +1,212 @@
+from collections import defaultdict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import io
+import mmap
+import os
+import xml.etree.ElementTree as ET
+
+from EventLog import EventLog
+import Instrumentation
+
+# Namespace used by the XES standard, in the {uri}tag form ElementTree reports
+XES_NS = '{http://www.xes-standard.org/}'
+TRACE_TAG = XES_NS + 'trace'
+EVENT_TAG = XES_NS + 'event'
+
+
+def decode_date(value):
+    # Keep the wall-clock time and drop the offset, as the algorithms expect
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def decode_boolean(value):
+    if value in ('true', 'false'):
+        return value == 'true'
+    raise ValueError(value)
+
+
+# Decoder for every XES attribute type, by element tag
+DECODERS = {
+    XES_NS + 'string': str,
+    XES_NS + 'id': str,
+    XES_NS + 'date': decode_date,
+    XES_NS + 'int': int,
+    XES_NS + 'float': float,
+    XES_NS + 'boolean': decode_boolean,
+}
+
+# Attributes the columnar EventLog is built from
+EVENT_LOG_ATTRIBUTES = frozenset(('concept:name', 'time:timestamp', 'org:resource'))
+
+
+def decode_attribute(tag, value):
+    """Converts a raw attribute value according to its declared XES type."""
+    decoder = DECODERS.get(tag, str)
+    try:
+        return decoder(value)
+    except ValueError:
+        return value  # If there's an issue, keep the original value
+
+
+class LazyEvent(Mapping):
+    """Event whose attribute values are only decoded when first read."""
+
+    __slots__ = ('raw', 'decoded')
+
+    def __init__(self, raw):
+        self.raw = raw  # Key to (tag, raw value)
+        self.decoded = {}
+
+    def __getitem__(self, key):
+        try:
+            return self.decoded[key]
+        except KeyError:
+            tag, value = self.raw[key]
+            value = self.decoded[key] = decode_attribute(tag, value)
+            return value
+
+    def __iter__(self):
+        return iter(self.raw)
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+def parse_trace(trace, attributes=None, lazy=False):
+    """Turns a <trace> element into a (case_id, events) pair.
+
+    attributes, if given, is the set of event attribute keys to keep; all
+    other attributes are skipped without being decoded. With lazy=True the
+    events are LazyEvent mappings that decode values on access.
+    """
+    # Get the case_id (concept:name of the trace)
+    case_id = "Unknown"  # Default if no concept:name found
+    events = []
+    for child in trace:
+        if child.tag == EVENT_TAG:
+            raw = {}
+            # Iterate over the attributes of the event we were asked for
+            for attribute in child:
+                key = attribute.attrib['key']
+                if attributes is None or key in attributes:
+                    raw[key] = (attribute.tag, attribute.attrib['value'])
+            if lazy:
+                events.append(LazyEvent(raw))
+            else:
+                events.append({key: decode_attribute(tag, value) for key, (tag, value) in raw.items()})
+        elif child.attrib.get('key') == 'concept:name' and child.tag == XES_NS + 'string':
+            case_id = child.attrib['value']
+    return case_id, events
+
+
+def iter_traces(filename, attributes=None, lazy=False):
+    """Yields (case_id, events) one trace at a time without building the whole tree.
+
+    Elements are cleared as soon as their trace has been converted, so memory
+    stays proportional to a single trace rather than to the whole document.
+    See parse_trace for attributes and lazy.
+    """
+    context = ET.iterparse(filename, events=('start', 'end'))
+    # The first event is the start of the <log> root, keep it to clear children
+    _, root = next(context)
+    depth = 0
+    for kind, element in context:
+        if kind == 'start':
+            depth += 1
+            continue
+        depth -= 1
+        # Only direct children of <log> are complete units we can drop
+        if depth != 0:
+            continue
+        if element.tag == TRACE_TAG:
+            yield parse_trace(element, attributes, lazy)
+        root.clear()
+
+
+def read_from_file(filename, attributes=None, lazy=False):
+    # The log dictionary will map case_id to its list of events
+    log = defaultdict(list)
+    for case_id, events in iter_traces(filename, attributes, lazy):
+        # Add events for the current trace (case_id) to the log
+        log[case_id] = events
+    return log
+
+
+def read_event_log(filename):
+    """Reads an XES file straight into a columnar EventLog."""
+    with Instrumentation.stage('read_event_log'):
+        return EventLog.from_cases(iter_traces(filename, EVENT_LOG_ATTRIBUTES))
+
+
+def trace_boundaries(filename):
+    """Returns the file head and the byte offsets of every <trace>.
+
+    The head runs from the start of the file through the opening <log ...>
+    tag, so it carries the XML declaration and its encoding. The last offset
+    is the position of </log>, so consecutive offsets delimit whole traces.
+    """
+    with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        log_start = data.find(b'<log')
+        head = data[:data.find(b'>', log_start) + 1]
+        offsets = []
+        pos = data.find(b'<trace', log_start)
+        while pos != -1:
+            # Skip other tags that merely start with "trace"
+            if data[pos + 6:pos + 7] in (b'>', b' ', b'\t', b'\r', b'\n'):
+                offsets.append(pos)
+            pos = data.find(b'<trace', pos + 6)
+        offsets.append(data.rfind(b'</log>'))
+    return head, offsets
+
+
+def read_chunk(filename, head, start, end):
+    """Parses the traces between two byte offsets into an EventLog."""
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        body = f.read(end - start)
+    # Reuse the original head so the declared encoding and the namespace
+    # declarations of the root tag still apply
+    document = io.BytesIO(head + body + b'</log>')
+    return EventLog.from_cases(iter_traces(document, EVENT_LOG_ATTRIBUTES))
+
+
+def read_event_log_parallel(filename, workers=None, chunks_per_worker=4):
+    """Reads an XES file into an EventLog, parsing trace chunks in a process pool.
+
+    The file is split at <trace> boundaries into chunks of roughly equal size;
+    the parsed chunks are merged back in file order, so the result is the same
+    as read_event_log(filename). workers=None uses every CPU.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f'workers must be at least 1, got {workers}')
+    head, offsets = trace_boundaries(filename)
+    if len(offsets) == 1:
+        return EventLog()
+
+    # Cut at the trace boundary closest to each equal share of the bytes
+    n_chunks = min(workers * chunks_per_worker, len(offsets) - 1)
+    share = (offsets[-1] - offsets[0]) / n_chunks
+    cuts = [offsets[0]]
+    i = 0
+    for k in range(1, n_chunks):
+        target = offsets[0] + k * share
+        while i < len(offsets) - 1 and offsets[i] < target:
+            i += 1
+        if offsets[i] > cuts[-1]:
+            cuts.append(offsets[i])
+    cuts.append(offsets[-1])
+
+    log = EventLog()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() yields results in submission order, which keeps trace order
+        for part in pool.map(read_chunk, [filename] * (len(cuts) - 1), [head] * (len(cuts) - 1),
+                             cuts[:-1], cuts[1:]):
+            log.extend(part)
+    return log
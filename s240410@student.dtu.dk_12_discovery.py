@@ -39,7 +39,7 @@ class PetriNet:
                 if self.get_tokens(edge[0]) == 0:
                     # print(f"Transition {transition} is not enabled. No tokens in {edge[0]}.")
                     return False
-        print(f"Transition {transition} is enabled.")
+        # print(f"Transition {transition} is enabled.")
         return True
 
     def fire_transition(self, transition):
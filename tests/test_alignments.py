@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+from Alignments import SKIP, Aligner, alignment_fitness, build_aligner
+from test_petrinet import choice_net
+
+
+def dict_log(*traces):
+    start = datetime(1970, 1, 1)
+    return {f'case_{i}': [{'concept:name': activity, 'time:timestamp': start + timedelta(hours=j)}
+                          for j, activity in enumerate(trace)]
+            for i, trace in enumerate(traces)}
+
+
+class ZeroHeuristic(Aligner):
+    """Plain Dijkstra over the same search space, as a reference."""
+
+    def heuristic(self, system, activities, marking, remaining):
+        return 0, [0.0] * len(system[1])
+
+
+def test_fitting_traces_align_at_zero_cost_whatever_the_path():
+    aligner = build_aligner(choice_net())
+    for trace in (tuple('abcd'), tuple('acbd')):
+        cost, moves = aligner.align(trace)
+        assert cost == 0
+        assert moves == [(activity, activity) for activity in trace]
+    assert alignment_fitness(dict_log('abcd', 'acbd'), choice_net()) == 1.0
+
+
+def test_costs_match_search_without_heuristic():
+    aligner = build_aligner(choice_net())
+    reference = ZeroHeuristic(aligner.net, aligner.labels, {'o_W': 1})
+    for trace in ('', 'a', 'abd', 'acd', 'abcdd', 'xabcd', 'dcba', 'aabbccdd', 'bcd'):
+        trace = tuple(trace)
+        result = aligner.align(trace)
+        assert result[0] == reference.align(trace)[0]
+        assert [log for log, _ in result[1] if log != SKIP] == list(trace)
+
+
+def test_timed_out_variants_are_retried_with_a_larger_budget():
+    log = dict_log('abcd', 'acbd')
+    cache = {}
+    # Nothing could be scored, which is not the same as not fitting at all
+    assert alignment_fitness(log, choice_net(), time_budget=0.0, cache=cache) is None
+    assert len(cache) == 2 and all(alignment is None for alignment, _ in cache.values())
+    assert alignment_fitness(log, choice_net(), time_budget=10.0, cache=cache) == 1.0
+    assert alignment_fitness(log, choice_net(), cache=cache) == 1.0
+    assert all(alignment[0] == 0 for alignment, _ in cache.values())
@@ -0,0 +1,99 @@
+import os
+import random
+from datetime import datetime, timedelta
+from itertools import combinations
+
+from Alpha import alpha, maximal_pairs
+from EventLog import as_event_log
+from XesReader import read_event_log
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOGS = ['extension-log.xes', 'extension-log-3.xes', 'extension-log-4.xes', 'extension-log-noisy-4.xes',
+        'test-log.xes']
+
+
+def brute_force(pairs):
+    pairs = set(pairs)
+    return {(A, B) for A, B in pairs
+            if not any((A, B) != (C, D) and A & C == A and B & D == B for C, D in pairs)}
+
+
+def brute_force_places(log):
+    """Y_W as the original alpha built it: every pair of activity sets, then the maximal ones."""
+    log = as_event_log(log)
+    names = log.activities
+    traces = [[names[code] for code in trace] for trace in log.variants()]
+    T_W = sorted({name for trace in traces for name in trace})
+    follows = {(trace[i], trace[i + 1]) for trace in traces for i in range(len(trace) - 1)}
+
+    def causal(a, b):
+        return (a, b) in follows and (b, a) not in follows
+
+    def unrelated(a, b):
+        return (a, b) not in follows and (b, a) not in follows
+
+    subsets = [frozenset(s) for r in range(1, len(T_W) + 1) for s in combinations(T_W, r)
+               if all(unrelated(a, b) for a, b in combinations(s, 2))]
+    X_W = {(A, B) for A in subsets for B in subsets if all(causal(a, b) for a in A for b in B)}
+    return {(A, B) for A, B in X_W
+            if not any((A, B) != (C, D) and A <= C and B <= D for C, D in X_W)}
+
+
+def places(pn):
+    """The (preset, postset) pair of every place of a net mined by alpha, besides i_W and o_W."""
+    pre = {}
+    post = {}
+    for source, target in pn.f:
+        post.setdefault(source, set()).add(target)
+        pre.setdefault(target, set()).add(source)
+    return {(frozenset(pre.get(p, ())), frozenset(post.get(p, ()))) for p in pn.p if p not in ('i_W', 'o_W')}
+
+
+def dict_log(traces):
+    start = datetime(2024, 1, 1)
+    return {f'c{i}': [{'concept:name': name, 'time:timestamp': start + timedelta(hours=j)}
+                      for j, name in enumerate(trace)]
+            for i, trace in enumerate(traces)}
+
+
+def test_maximal_pairs_matches_brute_force():
+    rng = random.Random(3)
+    for _ in range(500):
+        width = rng.randint(1, 6)
+        pairs = [(rng.getrandbits(width), rng.getrandbits(width)) for _ in range(rng.randint(0, 12))]
+        result = maximal_pairs(pairs)
+        assert len(result) == len(set(result))
+        assert set(result) == brute_force(pairs)
+
+
+def test_maximal_pairs_with_empty_masks():
+    assert maximal_pairs([(0, 0)]) == [(0, 0)]
+    assert maximal_pairs([(0, 0), (1, 0)]) == [(1, 0)]
+    assert set(maximal_pairs([(0, 1), (2, 0), (0, 0)])) == {(0, 1), (2, 0)}
+    assert maximal_pairs([(0, 0), (0, 0)]) == [(0, 0)]
+
+
+def test_alpha_places_match_brute_force_on_random_logs():
+    rng = random.Random(5)
+    for _ in range(200):
+        names = [chr(ord('a') + i) for i in range(rng.randint(2, 6))]
+        if rng.random() < 0.5:
+            # Unstructured traces, mostly parallel relations
+            traces = [[rng.choice(names) for _ in range(rng.randint(1, 6))] for _ in range(rng.randint(1, 8))]
+        else:
+            # Layers of choices, with the odd skipped layer or shuffled trace
+            layers = [names[i:i + 2] for i in range(0, len(names), 2)]
+            traces = []
+            for _ in range(rng.randint(1, 10)):
+                trace = [rng.choice(layer) for layer in layers if rng.random() > 0.1]
+                if rng.random() < 0.1:
+                    rng.shuffle(trace)
+                traces.append(trace)
+        log = dict_log(traces)
+        assert places(alpha(log)) == brute_force_places(log), traces
+
+
+def test_alpha_places_match_brute_force_on_bundled_logs():
+    for name in LOGS:
+        log = read_event_log(os.path.join(ROOT, name))
+        assert places(alpha(log)) == brute_force_places(log), name
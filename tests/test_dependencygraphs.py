@@ -0,0 +1,50 @@
+import os
+from datetime import datetime, timedelta
+
+from DependencyGraphs import IncrementalDFG, dependency_graph_file
+from XesReader import read_event_log
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def as_plain(graph):
+    return {source: dict(targets) for source, targets in graph.items()}
+
+
+def test_unwindowed_stream_matches_dependency_graph_file():
+    log = read_event_log(os.path.join(ROOT, 'extension-log.xes'))
+    events = []
+    for index, case_id in enumerate(log.case_ids):
+        for event in log.events(index):
+            events.append((event['time:timestamp'], case_id, event['concept:name']))
+    # Interleave the cases by time; the sort is stable within a case
+    events.sort(key=lambda event: event[0])
+    dfg = IncrementalDFG()
+    dfg.add_events((case_id, activity, timestamp) for timestamp, case_id, activity in events)
+    assert as_plain(dfg.snapshot()) == as_plain(dependency_graph_file(log))
+
+
+START = datetime(2024, 1, 1)
+
+
+def at(hours):
+    return START + timedelta(hours=hours)
+
+
+def test_idle_case_is_forgotten_regardless_of_other_cases():
+    alone = IncrementalDFG(window=timedelta(hours=1))
+    alone.add_events([('x', 'a', at(0)), ('x', 'b', at(2))])
+    busy = IncrementalDFG(window=timedelta(hours=1))
+    busy.add_events([('x', 'a', at(0)), ('y', 'c', at(1.5)), ('x', 'b', at(2))])
+    assert ('a', 'b') not in alone.counts
+    assert ('a', 'b') not in busy.counts
+
+
+def test_edges_leave_the_window():
+    dfg = IncrementalDFG(window=timedelta(hours=1))
+    dfg.add_events([('x', 'a', at(0)), ('x', 'b', at(0.5)), ('y', 'a', at(1)), ('y', 'c', at(1.25))])
+    assert dict(dfg.counts) == {('a', 'b'): 1, ('a', 'c'): 1}
+    dfg.add_event('z', 'a', at(1.75))
+    # a -> b was counted at 0:30, more than an hour before 1:45
+    assert dict(dfg.counts) == {('a', 'c'): 1}
+    assert 'x' not in dfg.last
@@ -0,0 +1,23 @@
+import os
+from datetime import datetime
+
+from LogCache import load_log
+from XesReader import read_event_log
+
+LOG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'extension-log.xes')
+
+
+def test_cached_log_can_be_extended(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    load_log(LOG, cache_dir)
+    log = load_log(LOG, cache_dir)  # Second load comes from the memory-mapped cache
+    fresh = read_event_log(LOG)
+    cases = len(log)
+    log.add_case('extra', [{'concept:name': 'new activity', 'time:timestamp': datetime(2024, 1, 1)}])
+    assert len(log) == cases + 1
+    assert log.events(cases)[0]['concept:name'] == 'new activity'
+    log.extend(fresh)
+    assert len(log) == 2 * cases + 1
+    assert log.num_events == 2 * fresh.num_events + 1
+    assert log.events(0) == fresh.events(0)
+    assert log.events(cases + 1) == fresh.events(0)
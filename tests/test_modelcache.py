@@ -0,0 +1,27 @@
+import xml.etree.ElementTree as ET
+
+from ModelCache import PNML_NAMESPACE, read_model, read_pnml, write_model, write_pnml
+from test_petrinet import choice_net
+
+
+def structure(net):
+    return sorted(map(str, net.p)), sorted(net.t.items()), sorted(map(str, net.f)), net.initial_marking
+
+
+def test_pnml_is_namespaced_and_round_trips(tmp_path):
+    net = choice_net()
+    path = str(tmp_path / 'net.pnml')
+    write_pnml(net, path)
+    root = ET.parse(path).getroot()
+    assert root.tag == f'{{{PNML_NAMESPACE}}}pnml'
+    assert root.find(f'{{{PNML_NAMESPACE}}}net/{{{PNML_NAMESPACE}}}page') is not None
+    assert structure(read_pnml(path)) == structure(net)
+
+
+def test_binary_model_round_trips(tmp_path):
+    net = choice_net()
+    path = str(tmp_path / 'net.pmnet')
+    write_model(net, path)
+    loaded = read_model(path)
+    assert loaded.p == net.p and loaded.t == net.t and loaded.f == net.f
+    assert loaded.initial_marking == net.initial_marking
@@ -0,0 +1,108 @@
+import random
+
+import Instrumentation
+from PetriNet import PetriNet
+
+
+def choice_net():
+    """i_W -> a -> {p, q}, q -> b -> p, p -> c -> r, {p, r} -> d -> o_W.
+
+    After a, p holds one or two tokens depending on whether b fires before c.
+    """
+    net = PetriNet()
+    net.add_places(['i_W', 'p', 'q', 'r', 'o_W'])
+    net.add_transitions((name, name) for name in 'abcd')
+    net.add_arcs([('i_W', 'a'), ('a', 'p'), ('a', 'q'), ('q', 'b'), ('b', 'p'), ('p', 'c'), ('c', 'r'),
+                  ('p', 'd'), ('r', 'd'), ('d', 'o_W')])
+    net.set_initial_marking('i_W')
+    return net
+
+
+def run(compiled, marking, names):
+    for name in names:
+        marking, _, _, missing = compiled.fire(marking, compiled.transition_index[name])
+        assert missing == 0
+    return marking
+
+
+def test_paths_to_the_same_marking_give_equal_keys():
+    compiled = choice_net().compile()
+    start = compiled.initial_marking
+    first = run(compiled, start, 'abcd')
+    second = run(compiled, start, 'acbd')
+    assert compiled.unpack(first) == compiled.unpack(second) == (0, 0, 0, 0, 1)
+    assert first == second
+    assert hash(first) == hash(second)
+    assert len({first, second}) == 1
+    # Both leave the tuple form once every place is back to one token
+    assert first == compiled.pack((0, 0, 0, 0, 1))
+
+
+def random_net(rng, n_places, n_transitions):
+    net = PetriNet()
+    places = [f'p{i}' for i in range(n_places)]
+    net.add_places(places)
+    net.add_transitions((f't{i}', f't{i}') for i in range(n_transitions))
+    arcs = []
+    for i in range(n_transitions):
+        arcs.extend((place, f't{i}') for place in rng.sample(places, rng.randint(1, 2)))
+        arcs.extend((f't{i}', place) for place in rng.sample(places, rng.randint(1, min(3, n_places))))
+    net.add_arcs(arcs)
+    for place in rng.sample(places, rng.randint(1, 2)):
+        net.set_initial_marking(place)
+    return net
+
+
+def test_fire_matches_token_game_and_keeps_markings_canonical():
+    rng = random.Random(7)
+    for _ in range(200):
+        net = random_net(rng, rng.randint(2, 6), rng.randint(1, 5))
+        compiled = net.compile()
+        marking = compiled.initial_marking
+        reference = [net.initial_marking.get(place, 0) for place in compiled.places]
+        for _ in range(15):
+            transition = rng.randrange(len(compiled.transitions))
+            preset = compiled.preset[transition]
+            enabled = all(reference[place] >= 1 for place in preset)
+            assert compiled.is_enabled(marking, transition) == enabled
+            marking, consumed, produced, missing = compiled.fire(marking, transition)
+            if enabled:
+                for place in preset:
+                    reference[place] -= 1
+                for place in compiled.postset[transition]:
+                    reference[place] += 1
+                assert (consumed, produced, missing) == (len(preset), len(compiled.postset[transition]), 0)
+            else:
+                assert (consumed, produced) == (0, 0) and missing > 0
+            assert compiled.unpack(marking) == tuple(reference)
+            # A marking is always in the form pack gives for its counts
+            assert marking == compiled.pack(reference)
+            assert type(marking) is type(compiled.pack(reference))
+
+
+def test_add_marking_adds_tokens_and_set_initial_marking_sets_them():
+    net = choice_net()
+    net.add_marking('p')
+    net.add_marking('p')
+    assert net.get_tokens('p') == 2
+    assert net.initial_marking == {'i_W': 1}
+    net.set_initial_marking('i_W', 1)
+    assert net.get_tokens('i_W') == 1 and net.initial_marking == {'i_W': 1}
+
+
+def test_token_game_counts_only_when_instrumentation_is_enabled():
+    net = choice_net()
+    Instrumentation.reset()
+    net.is_enabled('a')
+    net.fire_transition('a')
+    assert Instrumentation.counters == {}
+    Instrumentation.enable()
+    try:
+        net.is_enabled('c')
+        net.fire_transition('c')
+        net.fire_transition('c')
+    finally:
+        Instrumentation.disable()
+    assert Instrumentation.counters == {'petri_net.enabledness_checks': 1, 'petri_net.transitions_fired': 1,
+                                        'petri_net.missing_tokens': 1}
+    Instrumentation.reset()
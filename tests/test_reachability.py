@@ -0,0 +1,59 @@
+from PetriNet import PetriNet
+from Reachability import explore
+from test_petrinet import choice_net
+
+
+def sequence_net():
+    net = PetriNet()
+    net.add_places(['i_W', 'p', 'o_W'])
+    net.add_transitions([('a', 'a'), ('b', 'b')])
+    net.add_arcs([('i_W', 'a'), ('a', 'p'), ('p', 'b'), ('b', 'o_W')])
+    net.set_initial_marking('i_W')
+    return net
+
+
+def test_sound_sequence():
+    report = explore(sequence_net())
+    assert report['states'] == 3
+    assert report['complete'] and report['bounded'] and report['sound']
+
+
+def test_paths_to_one_marking_are_one_state():
+    for order in ('bfs', 'dfs'):
+        report = explore(choice_net(), order=order)
+        # i_W, pq, pp (tuple), qr, pr (reached from qr and pp), r2, o_W
+        assert report['states'] == 7
+        assert report['final_reachable']
+        # Only the two tokens left in r are stuck; the final marking is not a deadlock
+        assert report['deadlock_markings'] == [{'r': 2}]
+        assert not report['sound']
+
+
+def test_unbounded_place():
+    net = sequence_net()
+    net.add_arcs([('a', 'i_W')])
+    report = explore(net)
+    assert report['bounded'] is False
+    assert 'p' in report['unbounded_places']
+    assert not report['complete']
+
+
+def test_marking_that_cannot_complete_is_unsound():
+    # i_W -> a1 -> p1 -> c -> o_W, and i_W -> a2 -> p2 into a d/e cycle with p3 that never ends
+    net = PetriNet()
+    net.add_places(['i_W', 'p1', 'p2', 'p3', 'o_W'])
+    net.add_transitions((name, name) for name in ('a1', 'a2', 'c', 'd', 'e'))
+    net.add_arcs([('i_W', 'a1'), ('a1', 'p1'), ('p1', 'c'), ('c', 'o_W'),
+                  ('i_W', 'a2'), ('a2', 'p2'), ('p2', 'd'), ('d', 'p3'), ('p3', 'e'), ('e', 'p2')])
+    net.set_initial_marking('i_W')
+    report = explore(net)
+    assert report['complete'] and report['final_reachable']
+    assert report['deadlocks'] == 0
+    assert report['cannot_complete'] == 2
+    assert sorted(map(sorted, report['cannot_complete_markings'])) == [['p2'], ['p3']]
+    assert not report['sound']
+
+
+def test_sound_net_has_no_markings_that_cannot_complete():
+    report = explore(sequence_net())
+    assert report['cannot_complete'] == 0
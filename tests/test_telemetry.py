@@ -0,0 +1,62 @@
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from Telemetry import SEGMENTED_COLUMNS, assign_laps, telemetry_to_event_log
+
+
+def samples(rows):
+    """A driver.csv-like frame from (case, second, speed, gear, brake) rows."""
+    return pd.DataFrame({
+        'date': [f'2024-05-01T12:00:{second:02d}+00:00' for _, second, _, _, _ in rows],
+        'speed': [speed for _, _, speed, _, _ in rows],
+        'n_gear': [gear for _, _, _, gear, _ in rows],
+        'brake': [brake for _, _, _, _, brake in rows],
+        'drs': [0] * len(rows),
+        'driver_number': [1] * len(rows),
+        'CaseID': [case for case, _, _, _, _ in rows],
+    })
+
+
+def traces(log):
+    return {case_id: [log.activities[code] for code in log.trace(i)] for i, case_id in enumerate(log.case_ids)}
+
+
+def test_samples_without_a_case_are_left_out():
+    telemetry = samples([
+        ('1-01', 0, 100, 3, 0),
+        (None, 3, 300, 8, 0),
+        ('1-01', 1, 200, 4, 0),
+        ('1-02', 5, 50, 2, 100),
+        (None, 4, 310, 8, 100),
+        ('1-01', 2, 150, 4, 100),
+        ('1-02', 6, 80, 3, 0),
+    ])
+    log = telemetry_to_event_log(telemetry, SEGMENTED_COLUMNS)
+    assert traces(log) == {
+        '1-01': ['GearUp', 'TopSpeedAchieved', 'BrakeApplied'],
+        '1-02': ['BrakeReleased', 'GearUp', 'TopSpeedAchieved'],
+    }
+    assert log.num_events == 6
+
+
+def test_only_samples_without_a_case_give_an_empty_log():
+    log = telemetry_to_event_log(samples([(None, 0, 100, 3, 0)]), SEGMENTED_COLUMNS)
+    assert len(log) == 0
+
+
+def test_laps_of_two_drivers_with_a_missing_start_date():
+    lap_table = pd.DataFrame({
+        'DriverNumber': [1, 1, 1, 44],
+        'LapNumber': [1, 2, 3, 1],
+        'LapStartDate': ['2024-05-01T12:00:00', '2024-05-01T12:00:10', None, '2024-05-01T12:00:05'],
+        'LapTime': ['0 days 00:00:10', None, '0 days 00:00:10', '0 days 00:00:10'],
+    })
+    telemetry = pd.DataFrame({
+        'date': [f'2024-05-01T12:00:{second:02d}+00:00' for second in (2, 12, 30, 1, 7, 20)],
+        'driver_number': [1, 1, 1, 44, 44, 44],
+    })
+    telemetry = assign_laps(telemetry, lap_table)
+    # Lap 2 has no lap time and runs on, as no later lap of driver 1 has a start date
+    assert telemetry['LapNumber'].tolist() == [1, 2, 2, 0, 1, 0]
+    assert telemetry['CaseID'].tolist() == ['1-01', '1-02', '1-02', '44-00', '44-01', '44-00']
@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from Telemetry import assign_laps
+from TelemetryStore import laps, lap_path, read_telemetry, write_lap, write_telemetry
+
+
+def car_data():
+    return pd.DataFrame({
+        'date': [f'2024-05-01T12:00:{second:02d}+00:00' for second in (2, 12, 3, 13)],
+        'speed': [100, 200, 110, 210],
+        'driver_number': [1, 1, 44, 44],
+    })
+
+
+def lap_table():
+    return pd.DataFrame({
+        'DriverNumber': [1, 1, 44, 44],
+        'LapNumber': [1, 2, 1, 2],
+        'LapStartDate': ['2024-05-01T12:00:00', '2024-05-01T12:00:10'] * 2,
+        'LapTime': ['0 days 00:00:10'] * 4,
+    })
+
+
+def test_laps_keep_the_case_ids_of_assign_laps(tmp_path):
+    store = str(tmp_path)
+    telemetry = assign_laps(car_data(), lap_table())
+    assert write_telemetry(store, 'race', telemetry, lap_column='LapNumber') == 4
+    assert laps(store, 'race', 44) == [1, 2]
+    stored = read_telemetry(store, 'race', columns=['speed', 'CaseID'])
+    assert stored['CaseID'].tolist() == ['1-01', '1-02', '44-01', '44-02']
+    assert stored['speed'].tolist() == [100, 200, 110, 210]
+    assert 'LapNumber' not in stored and 'driver_number' not in stored
+
+
+def test_rewriting_a_lap_replaces_its_partition(tmp_path):
+    store = str(tmp_path)
+    write_lap(store, 'race', 1, 1, pd.DataFrame({'speed': [1, 2, 3]}))
+    write_lap(store, 'race', 1, 1, pd.DataFrame({'speed': [4, 5]}))
+    assert read_telemetry(store, 'race', columns=['speed'])['speed'].tolist() == [4, 5]
+    assert os.listdir(os.path.dirname(lap_path(store, 'race', 1, 1))) == ['lap=1']
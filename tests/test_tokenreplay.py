@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+from Alignments import alignment_fitness
+from Alpha import alpha, fitness_token_replay
+from PetriNet import PetriNet
+from TokenReplay import replay_totals
+from XesReader import read_event_log
+from test_alignments import dict_log
+
+LOG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'extension-log-noisy-4.xes')
+
+
+def test_worker_counts():
+    log = read_event_log(LOG)
+    net = alpha(log).compile()
+    serial = replay_totals(net, log)
+    assert replay_totals(net, log, workers=None) == serial
+    assert replay_totals(net, log, workers=2) == serial
+    for workers in (0, -1):
+        with pytest.raises(ValueError):
+            replay_totals(net, log, workers=workers)
+
+
+def test_activities_match_transition_names_not_ids():
+    # Transition names differ from their IDs, as in PetriNet.py's example
+    net = PetriNet()
+    net.add_places(['i_W', 'p', 'o_W'])
+    net.add_transitions([('A', -1), ('B', -2)])
+    net.add_arcs([('i_W', -1), (-1, 'p'), ('p', -2), (-2, 'o_W')])
+    net.set_initial_marking('i_W')
+    log = dict_log('AB', 'AB')
+    assert fitness_token_replay(log, net) == 1.0
+    assert alignment_fitness(log, net) == 1.0
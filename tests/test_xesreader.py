@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from XesReader import read_event_log, read_event_log_parallel
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def latin1_log(tmp_path):
+    """test-log.xes re-encoded as ISO-8859-1, with non-ASCII activity and resource names."""
+    with open(os.path.join(ROOT, 'test-log.xes'), encoding='utf-8') as f:
+        text = f.read()
+    text = text.replace('encoding="UTF-8"', 'encoding="ISO-8859-1"', 1)
+    text = text.replace('record issue', 'déclaration à l\'accueil').replace('admin-', 'employé-')
+    path = tmp_path / 'latin1.xes'
+    path.write_bytes(text.encode('latin-1'))
+    return str(path)
+
+def test_parallel_read_keeps_the_declared_encoding(tmp_path):
+    filename = latin1_log(tmp_path)
+    serial = read_event_log(filename)
+    parallel = read_event_log_parallel(filename, workers=2)
+    assert 'déclaration à l\'accueil' in serial.activities
+    assert parallel.case_ids == serial.case_ids
+    assert [parallel.events(i) for i in range(len(parallel))] == [serial.events(i) for i in range(len(serial))]
+
+def test_parallel_read_rejects_fewer_than_one_worker():
+    with pytest.raises(ValueError):
+        read_event_log_parallel(os.path.join(ROOT, 'test-log.xes'), workers=0)